@@ -0,0 +1,69 @@
+"""
+Action Dispatcher
+
+Scenarios resolve steps into display content plus side-effect actions (LED
+playlists, ...). The dispatcher runs those actions, at most once per state
+sequence, so re-resolving a step for a webview reload, prefetching or a
+benchmark never touches hardware twice.
+"""
+
+import logging
+import threading
+
+from config import WLED_ENABLED
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+def _run_wled(action):
+    if not WLED_ENABLED:
+        return
+    try:
+        from wled_controller import light_connection
+    except ImportError:
+        logger.warning("WLED controller not available")
+        return
+    with METRICS.timer("wled_dispatch"):
+        light_connection(action["source"], action["target"], action["reverse"])
+
+
+ACTION_HANDLERS = {
+    "wled": _run_wled,
+}
+
+
+def run_actions(actions):
+    """Run actions unconditionally"""
+    for action in actions:
+        handler = ACTION_HANDLERS.get(action.get("type"))
+        if handler is None:
+            logger.warning("Unknown action type '%s'", action.get("type"))
+            continue
+        try:
+            handler(action)
+            METRICS.counter("actions_dispatched").inc()
+        except Exception as e:
+            logger.error("Action %s failed: %s", action, e)
+
+
+class ActionDispatcher:
+    """Runs the actions of each state sequence exactly once"""
+
+    def __init__(self):
+        self.last_sequence = None
+        self._lock = threading.Lock()
+
+    def dispatch(self, actions, sequence):
+        """
+        Run `actions` unless this sequence was already dispatched. A sequence of None
+        (no sequence number in the state) always dispatches.
+        """
+        with self._lock:
+            if sequence is not None and sequence == self.last_sequence:
+                if actions:
+                    METRICS.counter("actions_suppressed").inc(len(actions))
+                return False
+            self.last_sequence = sequence
+        run_actions(actions)
+        return True
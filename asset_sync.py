@@ -0,0 +1,420 @@
+"""
+Content-Addressed Asset Sync
+
+The main node indexes images/ and scenarios/ into a manifest (path, sha256,
+size, dimensions), serves the files by hash over HTTP and publishes the
+manifest on the Redis channel. Display nodes compare it with their own tree
+and fetch only missing or changed files, in parallel and resuming partial
+downloads, so a small edit moves kilobytes instead of the whole image tree.
+"""
+
+import logging
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from config import ASSET_PORT, ASSET_BASE_URL, ASSET_HASH_CACHE
+from metrics import METRICS
+from rig import RigNamespace
+
+logger = logging.getLogger(__name__)
+
+ASSET_ROOTS = ("images", "scenarios")
+SCENARIO_EXTENSIONS = (".txt", ".py")
+MANIFEST_KEY = "asset_manifest"
+CHUNK_SIZE = 256 * 1024
+# Retry delays of a sync with failed fetches, doubled per attempt
+RETRY_MIN_SEC = 5
+RETRY_MAX_SEC = 300
+
+
+def _is_asset(relative_path):
+    parts = relative_path.split("/")
+    if any(part.startswith(".") or part == "__pycache__" for part in parts):
+        return False
+    if relative_path.endswith((".part", ".tmp")):
+        return False
+    if parts[0] == "scenarios":
+        return relative_path.endswith(SCENARIO_EXTENSIONS)
+    return True
+
+
+def _is_safe_path(relative_path):
+    """Manifest paths must stay below one of the asset roots of the local tree"""
+    if not relative_path or relative_path.startswith("/") or "\\" in relative_path or ":" in relative_path:
+        return False
+    parts = relative_path.split("/")
+    if any(part in ("", ".", "..") for part in parts):
+        return False
+    return parts[0] in ASSET_ROOTS and _is_asset(relative_path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _image_dimensions(path):
+    try:
+        from PIL import Image
+        # Only the header is read, no decode
+        with Image.open(path) as img:
+            return list(img.size)
+    except Exception:
+        return None
+
+
+class HashCache:
+    """sha256 and dimensions per path, reused while (mtime, size) stay the same"""
+
+    def __init__(self, path=ASSET_HASH_CACHE):
+        self.path = path
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def describe(self, root, relative_path):
+        full_path = os.path.join(root, relative_path)
+        stat = os.stat(full_path)
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            cached = self._entries.get(relative_path)
+            if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                return cached
+        entry = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": file_sha256(full_path),
+            "dims": _image_dimensions(full_path) if relative_path.startswith("images/") else None
+        }
+        with self._lock:
+            self._entries[relative_path] = entry
+            self._dirty = True
+        return entry
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logger.warning("Asset hash cache could not be saved: %s", e)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+def build_manifest(root=".", hash_cache=None):
+    """Manifest of all assets below `root`: {"version", "files": {path: {sha256, size, dims}}}"""
+    hash_cache = hash_cache or HashCache()
+    files = {}
+    with METRICS.timer("asset_manifest"):
+        for asset_root in ASSET_ROOTS:
+            for directory, _, filenames in os.walk(os.path.join(root, asset_root)):
+                for filename in filenames:
+                    relative_path = os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, "/")
+                    if not _is_asset(relative_path):
+                        continue
+                    entry = hash_cache.describe(root, relative_path)
+                    files[relative_path] = {"sha256": entry["sha256"], "size": entry["size"], "dims": entry["dims"]}
+        hash_cache.save()
+    version = hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return {"version": version, "files": files}
+
+
+def start_asset_server(manifest_source, root=".", port=ASSET_PORT, host="0.0.0.0"):
+    """
+    Serve GET /manifest and GET /blob/<sha256> (with Range) on host:port.
+    `manifest_source` is a callable returning the current manifest.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _AssetHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            manifest = manifest_source()
+            if self.path == "/manifest":
+                self._send_bytes(json.dumps(manifest).encode("utf-8"), "application/json")
+                return
+            if not self.path.startswith("/blob/"):
+                self.send_error(404)
+                return
+            # Content addressed: only files listed in the manifest can be requested
+            sha256 = self.path[len("/blob/"):]
+            relative_path = next(
+                (path for path, entry in manifest["files"].items() if entry["sha256"] == sha256), None
+            )
+            if relative_path is None:
+                self.send_error(404)
+                return
+            self._send_file(os.path.join(root, relative_path))
+
+        def _send_bytes(self, body, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_file(self, path):
+            size = os.path.getsize(path)
+            start = 0
+            range_header = self.headers.get("Range", "")
+            if range_header.startswith("bytes=") and range_header.endswith("-"):
+                try:
+                    start = int(range_header[len("bytes="):-1])
+                except ValueError:
+                    start = 0
+            if start >= size > 0:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            if start:
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size - start))
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+            with open(path, "rb") as f:
+                f.seek(start)
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    self.wfile.write(chunk)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), _AssetHandler)
+    except OSError as e:
+        logger.warning("Asset server could not be started on %s:%s: %s", host, port, e)
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class AssetPublisher:
+    """Main side: keeps the manifest current, serves it and announces it on Redis"""
+
+    def __init__(self, redis_client, root=".", rig=None, node_id=None):
+        self.redis_client = redis_client
+        self.rig = rig or RigNamespace()
+        self.node_id = node_id
+        self.root = root
+        self.hash_cache = HashCache()
+        self.manifest = build_manifest(root, self.hash_cache)
+        self.server = None
+
+    def start(self, port=ASSET_PORT, refresh_interval=60):
+        """Serve and publish the manifest, then re-check the tree every `refresh_interval` seconds"""
+        self.server = start_asset_server(lambda: self.manifest, self.root, port)
+        self.publish()
+
+        def refresh_loop():
+            while True:
+                time.sleep(refresh_interval)
+                try:
+                    self.refresh()
+                except OSError as e:
+                    logger.warning("Asset manifest refresh failed: %s", e)
+
+        if refresh_interval:
+            threading.Thread(target=refresh_loop, daemon=True).start()
+        return self.server
+
+    def refresh(self):
+        """Re-index (only changed files are hashed again) and publish if anything changed"""
+        manifest = build_manifest(self.root, self.hash_cache)
+        if manifest["version"] != self.manifest["version"]:
+            self.manifest = manifest
+            self.publish()
+
+    def publish(self):
+        message = {
+            "rig": self.rig.rig_id,
+            "source_role": "main",
+            "source_node": self.node_id,
+            "command": "asset_manifest",
+            "manifest": self.manifest
+        }
+        data = json.dumps(message)
+        try:
+            # Also kept as a key, nodes starting later sync from it
+            self.redis_client.set(self.rig.key(MANIFEST_KEY), data)
+            self.redis_client.publish(self.rig.channel, data)
+            logger.info("Asset manifest %s published (%d files)", self.manifest["version"], len(self.manifest["files"]))
+        except Exception as e:
+            logger.warning("Asset manifest could not be published: %s", e)
+
+
+class AssetSyncer:
+    """
+    Node side: fetch missing or changed files of a manifest from the main node.
+    The server address comes from this node's config (ASSET_BASE_URL, by default
+    its REDIS_HOST), main itself cannot know a routable address for every node.
+    """
+
+    def __init__(self, root=".", base_url=ASSET_BASE_URL, max_workers=4, timeout=10):
+        self.root = root
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.hash_cache = HashCache()
+        self.synced_version = None
+        # Newest manifest seen, retried until it is synced (main only republishes on changes)
+        self._latest = None
+        self._retry_delay = RETRY_MIN_SEC
+        self._retry_timer = None
+        self._lock = threading.Lock()
+
+    def missing(self, manifest):
+        """Paths whose local file is absent or has a different hash"""
+        paths = []
+        for relative_path, entry in manifest["files"].items():
+            if not _is_safe_path(relative_path):
+                METRICS.counter("asset_rejected_paths").inc()
+                logger.warning("Asset path %r outside the asset tree, ignored", relative_path)
+                continue
+            full_path = os.path.join(self.root, relative_path)
+            if not os.path.exists(full_path):
+                paths.append(relative_path)
+                continue
+            if self.hash_cache.describe(self.root, relative_path)["sha256"] != entry["sha256"]:
+                paths.append(relative_path)
+        self.hash_cache.save()
+        return paths
+
+    def sync(self, manifest):
+        """Bring the local tree up to the manifest, returns a summary dict"""
+        with self._lock:
+            self._latest = manifest
+            if manifest["version"] == self.synced_version:
+                return {"version": manifest["version"], "fetched": 0, "bytes": 0, "failed": []}
+            started = time.perf_counter()
+            paths = self.missing(manifest)
+            results = []
+            if paths:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    results = list(pool.map(
+                        lambda path: (path, self._fetch(path, manifest["files"][path])), paths
+                    ))
+            failed = [path for path, fetched in results if fetched is None]
+            fetched_bytes = sum(fetched for _, fetched in results if fetched)
+            if failed:
+                self._schedule_retry()
+            else:
+                self.synced_version = manifest["version"]
+                self._retry_delay = RETRY_MIN_SEC
+            METRICS.histogram("asset_sync").observe(time.perf_counter() - started)
+            summary = {
+                "version": manifest["version"],
+                "fetched": len(results) - len(failed),
+                "bytes": fetched_bytes,
+                "failed": failed
+            }
+            if paths:
+                logger.info("Asset sync %s: %d files, %.1f KiB fetched, %d failed",
+                            manifest["version"], summary["fetched"], fetched_bytes / 1024, len(failed))
+            return summary
+
+    def _schedule_retry(self):
+        """Sync the newest manifest again after a growing delay (called with the lock held)"""
+        if self._retry_timer is not None:
+            return
+        METRICS.counter("asset_sync_retries").inc()
+        logger.info("Asset sync retried in %ds", self._retry_delay)
+        self._retry_timer = threading.Timer(self._retry_delay, self._retry)
+        self._retry_timer.daemon = True
+        self._retry_timer.start()
+        self._retry_delay = min(self._retry_delay * 2, RETRY_MAX_SEC)
+
+    def _retry(self):
+        with self._lock:
+            self._retry_timer = None
+            manifest = self._latest
+        self.sync(manifest)
+
+    def _fetch(self, relative_path, entry):
+        """Download one blob, resuming a previous .part file of the same blob; returns bytes transferred or None"""
+        target = os.path.join(self.root, relative_path)
+        # Named after the blob, so a partial download of another version is never resumed
+        part_path = f"{target}.{entry['sha256'][:16]}.part"
+        directory = os.path.dirname(target) or "."
+        os.makedirs(directory, exist_ok=True)
+        stale = re.compile(re.escape(os.path.basename(target)) + r"(\.[0-9a-f]{16})?\.part")
+        for name in os.listdir(directory):
+            if stale.fullmatch(name) and name != os.path.basename(part_path):
+                # Partial download of a version that is no longer wanted
+                os.remove(os.path.join(directory, name))
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset > entry["size"]:
+            offset = 0
+
+        request = urllib.request.Request(f"{self.base_url}/blob/{entry['sha256']}")
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        transferred = 0
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                # 200 means the server ignored the range, start over
+                mode = "ab" if response.status == 206 else "wb"
+                with open(part_path, mode) as f:
+                    for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                        f.write(chunk)
+                        transferred += len(chunk)
+        except urllib.error.HTTPError as e:
+            if e.code != 416:
+                logger.warning("Asset %s could not be fetched: %s", relative_path, e)
+                return None
+            # Range not satisfiable: the .part file is already complete
+        except (urllib.error.URLError, OSError) as e:
+            # Partial data stays in the .part file for the next attempt
+            METRICS.counter("asset_fetch_failures").inc()
+            logger.warning("Asset %s could not be fetched: %s", relative_path, e)
+            return None
+        finally:
+            METRICS.counter("asset_bytes_fetched").inc(transferred)
+
+        if file_sha256(part_path) != entry["sha256"]:
+            os.remove(part_path)
+            METRICS.counter("asset_fetch_failures").inc()
+            logger.warning("Asset %s failed the hash check, discarded", relative_path)
+            return None
+        os.replace(part_path, target)
+        return transferred
+
+    def sync_in_background(self, manifest):
+        threading.Thread(target=self.sync, args=(manifest,), daemon=True).start()
+
+    def sync_from_snapshot(self, redis_client, key):
+        """Sync from the manifest main left in Redis, for nodes that start after it was published"""
+        try:
+            data = redis_client.get(key)
+        except Exception as e:
+            logger.warning("Asset manifest could not be read: %s", e)
+            return
+        if data:
+            message = json.loads(data)
+            self.sync_in_background(message["manifest"])
@@ -0,0 +1,275 @@
+"""
+Simulated Fleet Load Test
+
+Starts one main StateManager and N virtual display nodes whose webview is
+replaced by a recording sink, drives a scenario at a fixed step rate and
+reports publish-to-render latency percentiles, dropped, stale and skipped
+frames (steps that do not change a node's output) and render CPU time per node.
+
+Nodes run either in this process against the in-process LocalBroker, or in
+several worker processes against a real Redis server.
+
+With --rigs N, N independent rigs (each with its own main node and N nodes)
+share the broker and are driven at the same time. The report then checks
+isolation: no node may render a state published by another rig, and the
+latency of the other rigs should not follow a busy rig (--busy-rate).
+
+Usage (from the repository root):
+    python benchmarks/fleet_load_test.py --nodes 24 --rate 4 --duration 20
+    python benchmarks/fleet_load_test.py --nodes 48 --processes 4 --redis localhost:6379
+    python benchmarks/fleet_load_test.py --rigs 3 --nodes 6 --rate 2 --busy-rate 20
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Never drive real LED strips or write session logs from a load test
+os.environ.setdefault("WLED_ENABLED", "0")
+os.environ["EVENT_LOG_DIR"] = ""
+
+
+class RecordingSink:
+    """Stands in for the webview window: renders like display.js and records timings"""
+
+    def __init__(self, state_manager, name):
+        self.state_manager = state_manager
+        self.name = name
+        self.renders = []
+
+    def evaluate_js(self, script):
+        # Called on a render worker, like the page fetching the frame after updateImage()
+        snapshot = self.state_manager.snapshot
+        frame = self.state_manager.get_display_image_base64()
+        self.renders.append({
+            "step": snapshot.step,
+            "sent_at": snapshot.sent_at,
+            "rendered_at": time.time(),
+            "bytes": len(frame)
+        })
+
+    def report(self):
+        return {
+            "name": self.name,
+            "rig": self.state_manager.rig.rig_id,
+            "role": self.state_manager.role,
+            "renders": self.renders,
+            "skipped": self.state_manager.skipped_steps,
+            "cpu": self.state_manager.render_cpu
+        }
+
+
+def rig_ids(count):
+    """A single rig keeps the plain channel, several get rig1, rig2, ..."""
+    return [""] if count <= 1 else [f"rig{index + 1}" for index in range(count)]
+
+
+def start_nodes(count, offset, redis_client_factory, rig_id=""):
+    from state_manager_web import StateManager
+    from config import ROLES
+    from rig import format_address, format_node
+
+    roles = sorted(role for role in ROLES if role != "main")
+    sinks = []
+    for index in range(offset, offset + count):
+        role = roles[index % len(roles)]
+        # More nodes than roles become further screens of the same roles
+        instance = str(index // len(roles) + 1)
+        manager = StateManager(role, redis_client=redis_client_factory(), rig_id=rig_id,
+                               instance=instance)
+        node = format_node(role, instance)
+        sink = RecordingSink(manager, format_address(rig_id, f"node{index:03d}-{node}"))
+        manager.set_webview(sink)
+
+        threading.Thread(target=manager.listen_for_updates, daemon=True).start()
+        sinks.append(sink)
+    return sinks
+
+
+def drive(main_manager, scenario, rate, duration):
+    """Publish steps at `rate` per second, return list of (step, published_at)"""
+    interval = 1.0 / rate
+    published = []
+    main_manager.update_state({"scenario": scenario, "step": 0})
+    published.append((0, main_manager.last_sent_at))
+    max_steps = main_manager.get_max_steps()
+
+    deadline = time.monotonic() + duration
+    next_at = time.monotonic() + interval
+    step = 0
+    while time.monotonic() < deadline:
+        time.sleep(max(0.0, next_at - time.monotonic()))
+        next_at += interval
+        step = (step + 1) % max_steps
+        main_manager.update_state({"step": step})
+        published.append((step, main_manager.last_sent_at))
+    return published
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def analyse(published, reports):
+    """`published` maps rig id to that rig's (step, sent_at) list"""
+    latencies = []
+    nodes = []
+    for report in reports:
+        own = published[report["rig"]]
+        foreign_sent = {sent_at for rig, items in published.items() if rig != report["rig"] for _, sent_at in items}
+        renders = report["renders"]
+        rendered_sent = {r["sent_at"] for r in renders if r["sent_at"]}
+        missing = sum(1 for _, sent_at in own[1:] if sent_at not in rendered_sent)
+        # Unchanged steps are skipped on purpose and never reach the sink
+        dropped = max(0, missing - report["skipped"])
+
+        stale = 0
+        for render in renders:
+            # Latest publication that happened before this render
+            latest = None
+            for step, sent_at in own:
+                if sent_at > render["rendered_at"]:
+                    break
+                latest = step
+            if latest is not None and render["step"] != latest:
+                stale += 1
+            if render["sent_at"]:
+                latencies.append((report["rig"], render["rendered_at"] - render["sent_at"]))
+
+        nodes.append({
+            "name": report["name"],
+            "rig": report["rig"],
+            # Frames triggered by another rig's publication: must stay 0
+            "foreign": sum(1 for render in renders if render["sent_at"] in foreign_sent),
+            "frames": len(renders),
+            "dropped": dropped,
+            "stale": stale,
+            "skipped": report["skipped"],
+            "cpu": report["cpu"]
+        })
+    return latencies, nodes
+
+
+def print_report(published, latencies, nodes, duration):
+    for rig, items in sorted(published.items()):
+        values = [latency for latency_rig, latency in latencies if latency_rig == rig]
+        print(f"\n{'Rig ' + rig + ': p' if rig else 'P'}ublished steps: {len(items)}")
+        print("Publish-to-render latency: "
+              f"p50 {percentile(values, 0.5) * 1000:.1f}ms  "
+              f"p95 {percentile(values, 0.95) * 1000:.1f}ms  "
+              f"p99 {percentile(values, 0.99) * 1000:.1f}ms  "
+              f"max {max(values or [0]) * 1000:.1f}ms")
+    print(f"\n{'node':24} {'frames':>7} {'skipped':>8} {'dropped':>8} {'stale':>6} {'cpu s':>7} {'cpu %':>6}")
+    for node in nodes:
+        print(f"{node['name']:24} {node['frames']:>7} {node['skipped']:>8} {node['dropped']:>8} "
+              f"{node['stale']:>6} {node['cpu']:>7.2f} {node['cpu'] / duration * 100:>6.1f}")
+    print(f"\nTotal dropped: {sum(n['dropped'] for n in nodes)}  "
+          f"total stale: {sum(n['stale'] for n in nodes)}  "
+          f"total skipped: {sum(n['skipped'] for n in nodes)}")
+    if len(published) > 1:
+        foreign = sum(n["foreign"] for n in nodes)
+        print(f"Rig isolation: {'OK' if not foreign else 'VIOLATED'} ({foreign} foreign frames)")
+
+
+def _redis_factory(address):
+    import redis
+    host, _, port = address.partition(":")
+    return lambda: redis.Redis(host=host, port=int(port or 6379))
+
+
+def _worker(count, offset, address, lifetime, results, rig_id=""):
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+    from logging_setup import setup_logging
+    setup_logging()
+    sinks = start_nodes(count, offset, _redis_factory(address), rig_id)
+    time.sleep(lifetime)
+    results.put([sink.report() for sink in sinks])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated fleet load test")
+    parser.add_argument("--nodes", type=int, default=24, help="number of virtual display nodes per rig")
+    parser.add_argument("--scenario", default="http_level_3", help="scenario id to drive")
+    parser.add_argument("--rate", type=float, default=2.0, help="steps per second")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds to drive")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="spread nodes over worker processes (requires --redis)")
+    parser.add_argument("--redis", help="host:port of a Redis server instead of the in-process broker")
+    parser.add_argument("--rigs", type=int, default=1, help="independent rigs sharing the broker")
+    parser.add_argument("--busy-rate", type=float,
+                        help="steps per second of the first rig, to check the others are unaffected")
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    from logging_setup import setup_logging
+    from state_manager_web import StateManager
+
+    setup_logging()
+    settle = 2.0
+    rigs = rig_ids(args.rigs)
+    workers = []
+    results = multiprocessing.Queue()
+    if args.processes:
+        if not args.redis:
+            parser.error("--processes requires --redis")
+        factory = _redis_factory(args.redis)
+        per_process = -(-args.nodes // args.processes)
+        for rig_id in rigs:
+            for offset in range(0, args.nodes, per_process):
+                count = min(per_process, args.nodes - offset)
+                worker = multiprocessing.Process(
+                    target=_worker,
+                    args=(count, offset, args.redis, settle + args.duration + settle, results, rig_id)
+                )
+                worker.start()
+                workers.append(worker)
+        time.sleep(settle)
+    else:
+        if args.redis:
+            factory = _redis_factory(args.redis)
+        else:
+            from local_broker import LocalBroker
+            broker = LocalBroker()
+            factory = lambda: broker
+        sinks = [sink for rig_id in rigs for sink in start_nodes(args.nodes, 0, factory, rig_id)]
+
+    # Drive all rigs at the same time, each from its own main node
+    published = {}
+
+    def drive_rig(rig_id, rate):
+        main_manager = StateManager("main", redis_client=factory(), rig_id=rig_id)
+        published[rig_id] = drive(main_manager, args.scenario, rate, args.duration)
+
+    drivers = [
+        threading.Thread(target=drive_rig, args=(rig_id, args.busy_rate if index == 0 and args.busy_rate else args.rate))
+        for index, rig_id in enumerate(rigs)
+    ]
+    for driver in drivers:
+        driver.start()
+    for driver in drivers:
+        driver.join()
+
+    if workers:
+        reports = [report for _ in workers for report in results.get()]
+        for worker in workers:
+            worker.join()
+    else:
+        time.sleep(settle)
+        reports = [sink.report() for sink in sinks]
+
+    latencies, nodes = analyse(published, reports)
+    print_report(published, latencies, nodes, args.duration)
+
+
+if __name__ == "__main__":
+    main()
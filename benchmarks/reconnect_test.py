@@ -0,0 +1,137 @@
+"""
+Redis Reconnect Test
+
+Starts a local redis-server on a spare port with a main node and a display
+node, steps through a scenario, kills the server, keeps stepping on the main
+node during the outage and then starts the server again (empty, like after a
+crash). Passes when the display node reconnects by itself, ends on the main
+node's current step without blanking its screen in between, and reports
+reconnect time and outage duration from the metrics.
+
+Usage (from the repository root, needs the redis-server binary):
+    python benchmarks/reconnect_test.py
+    python benchmarks/reconnect_test.py --port 6390 --outage 5 --redis-server /usr/bin/redis-server
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Never drive real LED strips or write session logs from a test
+os.environ.setdefault("WLED_ENABLED", "0")
+os.environ["EVENT_LOG_DIR"] = ""
+os.environ.setdefault("REDIS_RECONNECT_MIN_SEC", "0.2")
+os.environ.setdefault("REDIS_RECONNECT_MAX_SEC", "2")
+
+
+class FrameRecorder:
+    """Stands in for the webview window and records which step each frame showed"""
+
+    def __init__(self, state_manager):
+        self.state_manager = state_manager
+        self.frames = []
+
+    def evaluate_js(self, script):
+        snapshot = self.state_manager.snapshot
+        self.frames.append((time.monotonic(), snapshot.scenario, snapshot.step))
+
+
+def start_server(binary, port):
+    import redis
+
+    process = subprocess.Popen(
+        [binary, "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    client = redis.Redis(port=port)
+    for _ in range(50):
+        try:
+            client.ping()
+            return process
+        except redis.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"redis-server did not start on port {port}")
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kill and restart Redis under a running main and display node")
+    parser.add_argument("--port", type=int, default=6390, help="port of the temporary redis-server")
+    parser.add_argument("--outage", type=float, default=3.0, help="seconds the server stays down")
+    parser.add_argument("--scenario", default="http_level_3", help="scenario id to step through")
+    parser.add_argument("--redis-server", default="redis-server", help="redis-server binary")
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    import redis
+    from logging_setup import setup_logging
+    from state_manager_web import StateManager
+    from metrics import METRICS
+
+    setup_logging()
+
+    server = start_server(args.redis_server, args.port)
+    main_node = StateManager("main", redis_client=redis.Redis(port=args.port, socket_connect_timeout=1))
+    display = StateManager("router", redis_client=redis.Redis(port=args.port, socket_connect_timeout=1))
+    recorder = FrameRecorder(display)
+    display.set_webview(recorder)
+    for node in (main_node, display):
+        threading.Thread(target=node.listen_for_updates, daemon=True).start()
+    time.sleep(1.0)
+
+    passed = False
+    try:
+        main_node.update_state({"scenario": args.scenario, "step": 0})
+        for step in range(1, 4):
+            time.sleep(0.3)
+            main_node.update_state({"step": step})
+        # Steps that leave the router's screen unchanged are skipped, compare the state
+        ok = wait_for(lambda: display.get_state()["step"] == 3, 5.0)
+        print(f"[INFO] Before outage: display on step {display.get_state()['step']}")
+
+        server.kill()
+        server.wait()
+        killed_at = time.monotonic()
+        print(f"[INFO] redis-server killed, down for {args.outage:.1f}s")
+        time.sleep(args.outage / 2)
+        # The teacher keeps clicking while the broker is away
+        main_node.update_state({"step": 4})
+        time.sleep(args.outage / 2)
+        server = start_server(args.redis_server, args.port)
+        print("[INFO] redis-server restarted")
+
+        target = main_node.state["step"]
+        resynced = wait_for(lambda: display.get_state()["step"] == target, 15.0)
+        blank = [frame for frame in recorder.frames if frame[0] >= killed_at and not frame[1]]
+        summary = METRICS.summary()
+        reconnect = summary["stages"].get("redis_reconnect", {})
+        print(f"[INFO] After restart: display on step {display.get_state()['step']}, main on step {target}")
+        print(f"Reconnects: {summary['counters'].get('redis_reconnects', 0)}  "
+              f"resyncs: {summary['counters'].get('redis_resyncs', 0)}  "
+              f"last outage: {summary['gauges'].get('redis_last_outage_seconds', 0):.2f}s  "
+              f"reconnect p50: {reconnect.get('p50', 0) * 1000:.1f}ms")
+        passed = ok and resynced and not blank
+        print(f"Result: {'PASS' if passed else 'FAIL'}"
+              f"{'' if not blank else f' ({len(blank)} blank frames during the outage)'}")
+    finally:
+        server.kill()
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Rendering Micro-Benchmark
+
+Renders every step of every scenario for every role through the StateManager
+render paths (no webview, no Redis) and reports p50/p95 render times and output
+sizes per content type. Results can be stored as a baseline and compared
+against it to catch regressions.
+
+Usage (from the repository root):
+    python benchmarks/render_benchmark.py
+    python benchmarks/render_benchmark.py --update-baseline
+    python benchmarks/render_benchmark.py --threshold 0.3 --rounds 5
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "render_baseline.json")
+
+# Ignore regressions smaller than this, they are timer noise
+MIN_REGRESSION_SEC = 0.002
+
+LONG_DESCRIPTION = " ".join(
+    ["Der Client sendet eine HTTP-Anfrage über Switch, Router und Firewall an den Webserver."] * 40
+)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def collect_cases(roles):
+    """Yield (case_name, role, content) for every scenario step and role"""
+    from scenarios.scenario_parser import TxtScenario
+
+    for txt_file in sorted(glob.glob(os.path.join("scenarios", "*.txt"))):
+        # resolve() is pure, so one parsed scenario serves all roles and no LED is touched
+        handler = TxtScenario("main", txt_file)
+        for role in sorted(roles):
+            for step in range(handler.maximum_steps):
+                content, _ = handler.resolve(step, role)
+                yield content["type"], role, content
+
+    # Menu state: device image per role
+    for role in sorted(roles):
+        yield "device", role, {"type": "image", "content": f"images/devices/{role}.png"}
+
+
+def collect_stress_cases(tmp_dir):
+    """Synthetic worst cases: very long descriptions and very large source images"""
+    from PIL import Image
+
+    large_png = os.path.join(tmp_dir, "large.png")
+    large_jpg = os.path.join(tmp_dir, "large.jpg")
+    img = Image.effect_noise((6000, 4000), 64).convert("RGB")
+    img.save(large_png)
+    img.save(large_jpg, quality=90)
+
+    yield "stress_long_text", "main", {"type": "text", "content": LONG_DESCRIPTION}
+    yield "stress_long_image_with_text", "router", {
+        "type": "image_with_text", "image": large_jpg, "text": LONG_DESCRIPTION
+    }
+    yield "stress_large_png", "router", {"type": "image", "content": large_png}
+    yield "stress_large_jpeg", "router", {"type": "image", "content": large_jpg}
+
+
+def run_benchmark(rounds):
+    from state_manager_web import StateManager
+    from frame_store import FRAME_STORE
+    from config import ROLES
+
+    roles = set(ROLES.keys()) | {"client"}
+    managers = {}
+    samples = {}
+
+    def render(case, role, content):
+        manager = managers.get(role)
+        if manager is None:
+            manager = managers[role] = StateManager(role, connect=False)
+        for _ in range(rounds):
+            # Measure rendering, not frame store hits
+            FRAME_STORE.clear()
+            manager.snapshot = manager.snapshot._replace(content=content)
+            entry = samples.setdefault(case, {"times": [], "bytes": [], "failed": 0, "raised": 0})
+            started = time.perf_counter()
+            try:
+                output = manager.get_display_image_base64()
+            except Exception as e:
+                print(f"{case} ({role}) raised {type(e).__name__}: {e}")
+                entry["failed"] += 1
+                entry["raised"] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            entry["times"].append(elapsed)
+            entry["bytes"].append(len(output))
+            if not output:
+                entry["failed"] += 1
+
+    for case, role, content in collect_cases(roles):
+        render(case, role, content)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for case, role, content in collect_stress_cases(tmp_dir):
+            render(case, role, content)
+
+    results = {}
+    for case, entry in sorted(samples.items()):
+        results[case] = {
+            "n": len(entry["times"]) + entry["raised"],
+            "failed": entry["failed"],
+            "p50": round(percentile(entry["times"], 0.5), 6),
+            "p95": round(percentile(entry["times"], 0.95), 6),
+            "bytes_p50": int(percentile(entry["bytes"], 0.5))
+        }
+    return results
+
+
+def failures(results):
+    """Return a list of messages for cases with failed renders"""
+    return [f"{case}: {r['failed']} of {r['n']} renders failed" for case, r in results.items() if r["failed"]]
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages, a baseline case that no longer renders is one"""
+    regressions = [f"{case}: missing from this run" for case in baseline if case not in results]
+    for case, current in results.items():
+        previous = baseline.get(case)
+        if not previous:
+            continue
+        for key in ("p50", "p95"):
+            limit = previous[key] * (1 + threshold)
+            if current[key] > limit and current[key] - previous[key] > MIN_REGRESSION_SEC:
+                regressions.append(
+                    f"{case} {key}: {current[key] * 1000:.1f}ms > {previous[key] * 1000:.1f}ms (+{threshold:.0%})"
+                )
+        if previous.get("bytes_p50") and current["bytes_p50"] > previous["bytes_p50"] * (1 + threshold):
+            regressions.append(
+                f"{case} bytes: {current['bytes_p50']} > {previous['bytes_p50']} (+{threshold:.0%})"
+            )
+    return regressions
+
+
+def print_report(results):
+    print(f"{'case':32} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'bytes':>10} {'failed':>7}")
+    for case, r in results.items():
+        print(f"{case:32} {r['n']:>5} {r['p50'] * 1000:>9.2f} {r['p95'] * 1000:>9.2f} "
+              f"{r['bytes_p50']:>10} {r['failed']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless rendering benchmark")
+    parser.add_argument("--rounds", type=int, default=3, help="renders per case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed relative regression (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="store results as new baseline")
+    parser.add_argument("--output", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    from logging_setup import setup_logging
+    setup_logging()
+    results = run_benchmark(args.rounds)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = failures(results)
+    if failed:
+        # A failing case has no meaningful timings, it must not pass the gate or become the baseline
+        print("\nFailed cases:")
+        for line in failed:
+            print(f"  - {line}")
+        sys.exit(1)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --update-baseline to create one")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Session Replay
+
+Feeds a recorded session (see event_log.py) back into StateManager instances:
+a main node republishes the recorded states with their original spacing
+(--speed 1), scaled (--speed 4) or back to back (--speed 0), and virtual
+display nodes render them like in the fleet load test. Logs of the main node
+replay the published states, logs of a display node the received ones. A
+recorded auto-progress timeline is replayed as a timeline, started relative to
+the replayed message and scaled with --speed, so the nodes advance its steps
+on their own clocks like in the session (--speed 0 keeps its step lengths). If the
+log holds frame acknowledgements, the recorded latencies are reported next to
+the replayed ones, so a latency spike from a class session can be reproduced
+offline.
+
+Usage (from the repository root):
+    python benchmarks/replay_session.py ~/.cache/nwt/sessions/session_main_20261019-081500.nwtlog
+    python benchmarks/replay_session.py session.nwtlog --speed 0 --nodes 12
+"""
+
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Never drive real LED strips or write new session logs from a replay
+os.environ.setdefault("WLED_ENABLED", "0")
+os.environ["EVENT_LOG_DIR"] = ""
+
+
+def load_session(path):
+    """Return ([(wall_time, command, state)], recorded frame latencies in seconds)"""
+    import event_log
+
+    sent, received, latencies = [], [], []
+    anchor = None
+    for timestamp, event_type, payload in event_log.read_events(path):
+        if event_type == event_log.SESSION:
+            anchor = (timestamp, payload["wall_time"])
+            continue
+        if anchor is None:
+            continue
+        wall_time = anchor[1] + (timestamp - anchor[0]) / 1e9
+        if event_type == event_log.STATE_SENT:
+            sent.append((wall_time, payload.get("command"), payload.get("state", {})))
+        elif event_type == event_log.STATE_RECEIVED:
+            received.append((wall_time, payload.get("command"), payload.get("state", {})))
+        elif event_type == event_log.FRAME_ACK and payload.get("sent_at"):
+            latencies.append(wall_time - payload["sent_at"])
+    return sent or received, latencies
+
+
+def rebase_timeline(timeline, wall_time, speed):
+    """Recorded timeline moved to start as far before now as it started before its message"""
+    scale = speed if speed > 0 else 1.0
+    return dict(
+        timeline,
+        started_at=time.time() - (wall_time - timeline["started_at"]) / scale,
+        durations=[duration / scale for duration in timeline["durations"]]
+    )
+
+
+def replay(main_manager, states, speed):
+    """
+    Republish the recorded states, return (list of (step, published_at), list of
+    (timeline, published_at) for the published timelines)
+    """
+    published, timelines = [], []
+    if not states:
+        return published, timelines
+    started = time.monotonic()
+    first = states[0][0]
+    for wall_time, command, state in states:
+        if speed > 0:
+            time.sleep(max(0.0, started + (wall_time - first) / speed - time.monotonic()))
+        if command == "show_role_image":
+            new_state = {"scenario": "", "step": 0}
+        else:
+            new_state = {key: state[key] for key in ("scenario", "step", "wled_state") if key in state}
+            if state.get("timeline"):
+                new_state["timeline"] = rebase_timeline(state["timeline"], wall_time, speed)
+        main_manager.update_state(new_state)
+        published.append((main_manager.state["step"], main_manager.last_sent_at))
+        if "timeline" in new_state:
+            timelines.append((main_manager.state["timeline"], main_manager.last_sent_at))
+    return published, timelines
+
+
+def with_timeline_steps(published, timelines, until):
+    """Add the steps the nodes advanced on their own, due before the next publish or `until`"""
+    from timeline import timeline_steps
+
+    sent_times = sorted(sent_at for _, sent_at in published)
+    steps = list(published)
+    for timeline, sent_at in timelines:
+        later = [other for other in sent_times if other > sent_at]
+        steps.extend(timeline_steps(timeline, min(later + [until])))
+    return sorted(steps, key=lambda item: item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session")
+    parser.add_argument("log", help="session log (.nwtlog) of the main node or a display node")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="1 replays in real time, 4 four times faster, 0 as fast as possible")
+    parser.add_argument("--nodes", type=int, default=5, help="number of virtual display nodes")
+    parser.add_argument("--redis", help="host:port of a Redis server instead of the in-process broker")
+    args = parser.parse_args()
+
+    log_path = os.path.abspath(os.path.expanduser(args.log))
+    os.chdir(REPO_ROOT)
+    from logging_setup import setup_logging
+    from state_manager_web import StateManager
+    from fleet_load_test import start_nodes, analyse, print_report, percentile, _redis_factory
+
+    setup_logging()
+
+    states, recorded = load_session(log_path)
+    if not states:
+        print(f"[ERROR] No state changes in {log_path}")
+        sys.exit(1)
+    print(f"[INFO] Replaying {len(states)} state changes "
+          f"({states[-1][0] - states[0][0]:.1f}s recorded) at "
+          f"{'maximum speed' if args.speed <= 0 else f'{args.speed:g}x'}")
+
+    if args.redis:
+        factory = _redis_factory(args.redis)
+    else:
+        from local_broker import LocalBroker
+        broker = LocalBroker()
+        factory = lambda: broker
+    sinks = start_nodes(args.nodes, 0, factory)
+    time.sleep(1.0)
+
+    main_manager = StateManager("main", redis_client=factory())
+    started = time.monotonic()
+    published, timelines = replay(main_manager, states, args.speed)
+    time.sleep(2.0)
+    duration = time.monotonic() - started
+    # Frames of timeline steps are measured from when each step was due
+    published = with_timeline_steps(published, timelines, time.time() - 1.0)
+
+    latencies, nodes = analyse({"": published}, [sink.report() for sink in sinks])
+    print_report({"": published}, latencies, nodes, duration)
+    if recorded:
+        print(f"\nRecorded frame latency: p50 {percentile(recorded, 0.5) * 1000:.1f}ms  "
+              f"p95 {percentile(recorded, 0.95) * 1000:.1f}ms  "
+              f"p99 {percentile(recorded, 0.99) * 1000:.1f}ms  "
+              f"max {max(recorded) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import socket
+
+# Native panel resolution per node (hostname -> (width, height)). Nodes that are
+# not listed detect their screen size at startup or fall back to the default.
+DISPLAY_PROFILES = {
+    # "rpi6": (1920, 1080),
+}
+
+DEFAULT_RESOLUTION = (1280, 720)
+
+
+def parse_resolution(value):
+    """Parse '1920x1080' into (1920, 1080), None if invalid"""
+    try:
+        width, height = value.lower().split("x")
+        return int(width), int(height)
+    except (AttributeError, ValueError):
+        return None
+
+
+def configured_resolution():
+    """Resolution forced by DISPLAY_RESOLUTION or the node's profile, None if not configured"""
+    forced = parse_resolution(os.getenv("DISPLAY_RESOLUTION", ""))
+    if forced:
+        return forced
+    return DISPLAY_PROFILES.get(socket.gethostname().lower())
+
+
+def resolve_resolution():
+    return configured_resolution() or DEFAULT_RESOLUTION
@@ -4,6 +4,21 @@ import os
 REDIS_HOST = os.getenv("REDIS_HOST", "192.168.1.100")  # Replace with your main controller's IP
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_CHANNEL = "scenario_updates"
+# Listener reconnect backoff: doubles from MIN up to MAX seconds while the broker is away
+REDIS_RECONNECT_MIN_SEC = float(os.getenv("REDIS_RECONNECT_MIN_SEC", "0.5"))
+REDIS_RECONNECT_MAX_SEC = float(os.getenv("REDIS_RECONNECT_MAX_SEC", "10"))
+
+# Rig (classroom setup) this node belongs to; namespaces channel, snapshot and heartbeat
+# keys so several rigs can share one broker. Empty: single rig on the plain channel
+RIG_ID = os.getenv("RIG_ID", "")
+HEARTBEAT_INTERVAL_SEC = int(os.getenv("HEARTBEAT_INTERVAL_SEC", "5"))  # 0 disables heartbeats
+# Unique id of this node process (echo suppression, heartbeats); empty: hostname plus random suffix
+NODE_ID = os.getenv("NODE_ID", "")
+
+# Auto-progress configuration
+AUTO_PROGRESS_TIMEOUT = int(os.getenv("AUTO_PROGRESS_TIMEOUT", "8000"))  # milliseconds, step length of scenarios without time_sec
+# Playback timeline: a heartbeat step outside the timeline by more than this triggers a correction
+TIMELINE_DRIFT_TOLERANCE_SEC = float(os.getenv("TIMELINE_DRIFT_TOLERANCE_SEC", "0.5"))
 
 # Define roles and their IDs
 ROLES = {
@@ -13,4 +28,64 @@ ROLES = {
     "router": 4,
     "dns": 5,
     "server": 6
-}
\ No newline at end of file
+}
+
+# Logging: default level, per-module levels ("wled_controller=DEBUG,scenarios=WARNING"),
+# "text" or "json" lines, and the interval in which a repeated warning is shown once
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_RATE_LIMIT_SEC = float(os.getenv("LOG_RATE_LIMIT_SEC", "10"))
+
+# Metrics: Prometheus endpoint on localhost and JSON summary on the Redis channel
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 disables the endpoint
+METRICS_INTERVAL_SEC = int(os.getenv("METRICS_INTERVAL_SEC", "30"))  # 0 disables the summary
+
+# LED strips; set WLED_ENABLED=0 to run without hardware (load tests, CI)
+WLED_ENABLED = os.getenv("WLED_ENABLED", "1") != "0"
+
+# Display output of non-main nodes: "web" (webview), "file" or "framebuffer"
+DISPLAY_MODE = os.getenv("DISPLAY_MODE", "web")
+HEADLESS_OUTPUT_DIR = os.getenv("HEADLESS_OUTPUT_DIR", "/tmp/nwt-frames")
+FRAMEBUFFER_DEVICE = os.getenv("FRAMEBUFFER_DEVICE", "/dev/fb0")
+
+# Last shown frame per role, displayed immediately after a restart
+LAST_FRAME_DIR = os.getenv("LAST_FRAME_DIR", os.path.expanduser("~/.cache/nwt"))
+
+# Legacy Python scenarios are compiled into step tables here (see scenario_converter)
+SCENARIO_CACHE_DIR = os.getenv("SCENARIO_CACHE_DIR", os.path.join(os.path.expanduser("~/.cache/nwt"), "scenarios"))
+
+# Scenario menu: parsed metadata and thumbnails, rebuilt per file when its mtime changes
+SCENARIO_CATALOG_PATH = os.getenv("SCENARIO_CATALOG_PATH", os.path.join(os.path.expanduser("~/.cache/nwt"), "scenario_catalog.json"))
+
+# Asset sync: main serves images/ and scenarios/ by content hash, nodes fetch what they miss
+ASSET_PORT = int(os.getenv("ASSET_PORT", "8765"))  # 0 disables the server on main
+ASSET_BASE_URL = os.getenv("ASSET_BASE_URL", f"http://{REDIS_HOST}:{ASSET_PORT}")
+ASSET_HASH_CACHE = os.getenv("ASSET_HASH_CACHE", os.path.join(os.path.expanduser("~/.cache/nwt"), "asset_hashes.json"))
+
+# Binary session log per node for replay (see event_log), empty disables it
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", os.path.join(os.path.expanduser("~/.cache/nwt"), "sessions"))
+
+# Step profiler: PROFILE_STEPS > 0 samples the next N steps after startup, otherwise it
+# runs on request from the admin panel. Results go to Redis and, unless empty, PROFILE_DIR
+PROFILE_STEPS = int(os.getenv("PROFILE_STEPS", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.expanduser("~/.cache/nwt"), "profiles"))
+
+# Render time budget per frame; slower nodes lower their render quality step by step (0 disables)
+RENDER_BUDGET_MS = int(os.getenv("RENDER_BUDGET_MS", "250"))
+
+# Threads rendering frames for the state actors of this process
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+
+# Memory budget of the decoded, pre-scaled source images (0 disables the cache)
+IMAGE_CACHE_BUDGET_MB = int(os.getenv("IMAGE_CACHE_BUDGET_MB", "64"))
+
+# Encoded frame store: resident memory budget and memory-mapped spill file
+FRAME_STORE_BUDGET_MB = int(os.getenv("FRAME_STORE_BUDGET_MB", "48"))
+FRAME_SPILL_MB = int(os.getenv("FRAME_SPILL_MB", "256"))  # 0 disables spilling
+FRAME_SPILL_PATH = os.getenv("FRAME_SPILL_PATH", os.path.join(os.path.expanduser("~/.cache/nwt"), "frames.spill"))
+
+# "server": render captions into the frame with Pillow; "client": send image
+# reference and caption as layers and let the web page draw the text
+COMPOSITING = os.getenv("COMPOSITING", "server")
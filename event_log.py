@@ -0,0 +1,109 @@
+"""
+Session Event Log
+
+Append-only binary record of what a node does during a class session: states
+it publishes or receives, scenario preloads, frame acknowledgements and LED
+commands. Every record is a fixed header (monotonic timestamp in ns, event
+type, payload length) followed by a compact JSON payload, so logging stays a
+buffered write on the hot path. Recorded sessions can be fed back into
+StateManager instances with their original timing (benchmarks/replay_session.py).
+"""
+
+import logging
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+
+from config import EVENT_LOG_DIR
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NWTLOG1\n"
+# monotonic_ns (uint64), event type (uint8), payload length (uint32), little endian
+HEADER = struct.Struct("<QBI")
+
+SESSION = 0          # Written on open: node, rig and the wall clock at a monotonic instant
+STATE_SENT = 1       # State published by this node (main)
+STATE_RECEIVED = 2   # State message received from another node
+PRELOAD = 3          # Scenario loaded and parsed
+FRAME_ACK = 4        # Frame handed to the display
+WLED = 5             # LED action dispatched
+TIMELINE_STEP = 6    # Step advanced locally on a running timeline, without a message
+
+EVENT_NAMES = {
+    SESSION: "session",
+    STATE_SENT: "state_sent",
+    STATE_RECEIVED: "state_received",
+    PRELOAD: "preload",
+    FRAME_ACK: "frame_ack",
+    WLED: "wled",
+    TIMELINE_STEP: "timeline_step",
+}
+
+
+class EventLog:
+    def __init__(self, path, session=None, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._flushed_at = time.monotonic()
+        # Anchor to map monotonic timestamps of this session to wall clock time
+        self.record(SESSION, dict(session or {}, wall_time=time.time(), pid=os.getpid()))
+        atexit.register(self.close)
+
+    def record(self, event_type, payload):
+        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        header = HEADER.pack(time.monotonic_ns(), event_type, len(data))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(header + data)
+            now = time.monotonic()
+            if now - self._flushed_at >= self.flush_interval:
+                self._file.flush()
+                self._flushed_at = now
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def open_event_log(node_name, rig_id="", directory=EVENT_LOG_DIR):
+    """Start a new session file for this node, None if event logging is disabled"""
+    if not directory:
+        return None
+    name = f"{rig_id}_{node_name}" if rig_id else node_name
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(directory, f"session_{name.replace('#', '-')}_{stamp}.nwtlog")
+    try:
+        return EventLog(path, {"node": node_name, "rig": rig_id})
+    except OSError as e:
+        logger.warning("Event log could not be opened: %s", e)
+        return None
+
+
+def read_events(path):
+    """
+    Yield (monotonic_ns, event_type, payload) for every record of a log file.
+    A record cut off by a crash or power loss ends the log.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an event log")
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            timestamp, event_type, length = HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, event_type, json.loads(data)
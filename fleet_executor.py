@@ -0,0 +1,114 @@
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SshTransport:
+    """Run commands on a node via the system ssh client with connection multiplexing"""
+
+    def __init__(self, user="rpi", control_dir=None, control_persist=120, connect_timeout=3):
+        self.user = user
+        self.control_dir = control_dir or os.path.join(tempfile.gettempdir(), "nwt-ssh")
+        self.control_persist = control_persist
+        self.connect_timeout = connect_timeout
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+
+    def build_command(self, host, command):
+        # %C is a hash of host, port and user, keeping the socket path short
+        return [
+            "ssh",
+            "-o", "BatchMode=yes",
+            "-o", "StrictHostKeyChecking=accept-new",
+            "-o", f"ConnectTimeout={self.connect_timeout}",
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={os.path.join(self.control_dir, '%C')}",
+            "-o", f"ControlPersist={self.control_persist}",
+            f"{self.user}@{host}",
+            command,
+        ]
+
+    def run(self, host, command, timeout):
+        """Run a remote shell command, return (exit_code, stdout, stderr)"""
+        completed = subprocess.run(
+            self.build_command(host, command),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout
+        )
+        return (
+            completed.returncode,
+            completed.stdout.decode(errors="replace"),
+            completed.stderr.decode(errors="replace")
+        )
+
+
+class FleetExecutor:
+    """Run one command concurrently on several nodes and collect structured results"""
+
+    def __init__(self, hosts, transport=None, max_workers=8, default_timeout=5):
+        self.hosts = hosts
+        self.transport = transport or SshTransport()
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+
+    def run_on(self, name, command, timeout=None):
+        """Run a command on a single node. Never raises, errors end up in the result."""
+        timeout = timeout or self.default_timeout
+        result = {
+            "name": name,
+            "ok": False,
+            "exit_code": None,
+            "stdout": "",
+            "stderr": "",
+            "duration": 0.0,
+            "timed_out": False
+        }
+
+        host = self.hosts.get(name)
+        if not host:
+            result["stderr"] = f"unknown node '{name}'"
+            return result
+
+        if not isinstance(command, str):
+            command = shlex.join(command)
+
+        started = time.monotonic()
+        try:
+            exit_code, stdout, stderr = self.transport.run(host, command, timeout)
+            result["exit_code"] = exit_code
+            result["stdout"] = stdout.strip()
+            result["stderr"] = stderr.strip()
+            result["ok"] = exit_code == 0
+        except subprocess.TimeoutExpired:
+            result["timed_out"] = True
+            result["stderr"] = f"timed out after {timeout}s"
+        except Exception as e:
+            result["stderr"] = str(e)
+        result["duration"] = round(time.monotonic() - started, 3)
+        return result
+
+    def run(self, command, names=None, timeout=None):
+        """
+        Run a command on all nodes (or the given names) in parallel.
+        `command` is either one command for every node or a dict name -> command.
+        Returns a dict name -> result.
+        """
+        if isinstance(command, dict):
+            commands = command
+        else:
+            commands = {name: command for name in (names or self.hosts.keys())}
+
+        if not commands:
+            return {}
+
+        workers = min(self.max_workers, len(commands))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(self.run_on, name, cmd, timeout)
+                for name, cmd in commands.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
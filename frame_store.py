@@ -0,0 +1,136 @@
+"""
+Memory-Budgeted Frame Store
+
+Holds encoded frames (PNG bytes) under a hard memory budget. When the budget is
+exceeded, the least recently used frames spill into a memory-mapped file on
+local storage. Pages of the spill file are file-backed, so the kernel can drop
+them under memory pressure instead of swapping. A spilled frame is copied out
+under the lock when it is read, so a later spill reusing its region never
+changes bytes a caller still holds.
+"""
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+from config import FRAME_STORE_BUDGET_MB, FRAME_SPILL_MB, FRAME_SPILL_PATH
+from metrics import METRICS
+
+
+class FrameStore:
+    def __init__(self, budget_bytes, spill_bytes=0, spill_path=None):
+        self.budget_bytes = budget_bytes
+        self.spill_bytes = spill_bytes
+        self.spill_path = spill_path
+        self.resident = OrderedDict()
+        self.resident_bytes = 0
+        # Spilled entries in write order: key -> (offset, length)
+        self.spilled = OrderedDict()
+        self.spilled_bytes = 0
+        self._spill_map = None
+        self._spill_head = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the frame bytes, None if unknown"""
+        with self._lock:
+            data = self.resident.get(key)
+            if data is not None:
+                self.resident.move_to_end(key)
+                METRICS.counter("frame_store_hits").inc()
+                return data
+            location = self.spilled.get(key)
+            if location is not None:
+                offset, length = location
+                METRICS.counter("frame_store_spill_hits").inc()
+                return self._spill_map[offset:offset + length]
+        METRICS.counter("frame_store_misses").inc()
+        return None
+
+    def put(self, key, data):
+        size = len(data)
+        with self._lock:
+            self._discard(key)
+            if size > self.budget_bytes:
+                # Never resident, go straight to the spill file
+                self._spill(key, data)
+            else:
+                self.resident[key] = data
+                self.resident_bytes += size
+                while self.resident_bytes > self.budget_bytes:
+                    cold_key, cold_data = self.resident.popitem(last=False)
+                    self.resident_bytes -= len(cold_data)
+                    self._spill(cold_key, cold_data)
+            self._publish()
+
+    def clear(self):
+        with self._lock:
+            self.resident.clear()
+            self.spilled.clear()
+            self.resident_bytes = 0
+            self.spilled_bytes = 0
+            self._spill_head = 0
+            self._publish()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.resident or key in self.spilled
+
+    def _discard(self, key):
+        data = self.resident.pop(key, None)
+        if data is not None:
+            self.resident_bytes -= len(data)
+        location = self.spilled.pop(key, None)
+        if location is not None:
+            self.spilled_bytes -= location[1]
+
+    def _spill(self, key, data):
+        size = len(data)
+        if not self.spill_bytes or size > self.spill_bytes:
+            METRICS.counter("frame_store_evictions").inc()
+            return
+        if self._spill_map is None:
+            self._open_spill_file()
+
+        # Ring buffer: wrap to the start when the frame does not fit behind the head
+        offset = self._spill_head
+        if offset + size > self.spill_bytes:
+            offset = 0
+
+        # Evict the oldest spilled frames overlapping the target region
+        end = offset + size
+        for old_key, (old_offset, old_length) in list(self.spilled.items()):
+            if old_offset < end and offset < old_offset + old_length:
+                del self.spilled[old_key]
+                self.spilled_bytes -= old_length
+                METRICS.counter("frame_store_evictions").inc()
+
+        self._spill_map[offset:end] = data
+        self.spilled[key] = (offset, size)
+        self.spilled_bytes += size
+        self._spill_head = end
+
+    def _open_spill_file(self):
+        path = f"{self.spill_path}.{os.getpid()}"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, self.spill_bytes)
+            self._spill_map = mmap.mmap(fd, self.spill_bytes)
+        finally:
+            os.close(fd)
+            # The mapping keeps the file alive; nothing is left behind on exit
+            os.unlink(path)
+
+    def _publish(self):
+        METRICS.gauge("frame_store_resident_bytes").set(self.resident_bytes)
+        METRICS.gauge("frame_store_spilled_bytes").set(self.spilled_bytes)
+
+
+# Process-wide frame store shared by all StateManager instances
+FRAME_STORE = FrameStore(
+    FRAME_STORE_BUDGET_MB * 1024 * 1024,
+    FRAME_SPILL_MB * 1024 * 1024,
+    FRAME_SPILL_PATH
+)
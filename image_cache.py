@@ -0,0 +1,99 @@
+"""
+Decoded Source Image Cache
+
+Scenarios reuse the same source images across many steps and roles. This cache
+keeps decoded, already downscaled copies keyed by (path, mtime, target box,
+filter), so each file is decoded and resampled once. The cache is limited by
+the memory of the decoded bitmaps, not by their number. Large JPEGs are decoded at
+reduced size via Image.draft and other formats are shrunk with Image.reduce
+before the final resample (LANCZOS unless the quality governor picked a faster
+filter).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from config import IMAGE_CACHE_BUDGET_MB
+from metrics import METRICS
+
+
+def image_bytes(img):
+    """Memory of a decoded bitmap, one byte per band and pixel"""
+    return img.width * img.height * len(img.getbands())
+
+
+class SourceImageCache:
+    def __init__(self, budget_bytes=IMAGE_CACHE_BUDGET_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.cached_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_path, width, height, resample=None):
+        """
+        Return the image scaled to fit into (width, height), keeping the aspect ratio.
+        The returned image is shared and must not be modified by the caller.
+        """
+        mtime = os.stat(image_path).st_mtime_ns
+        key = (image_path, mtime, width, height, resample)
+
+        with self._lock:
+            img = self._entries.get(key)
+            if img is not None:
+                self._entries.move_to_end(key)
+                METRICS.counter("image_cache_hits").inc()
+                return img
+
+        METRICS.counter("image_cache_misses").inc()
+        img = self._load_scaled(image_path, width, height, resample)
+
+        size = image_bytes(img)
+        if size <= self.budget_bytes:
+            with self._lock:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self.cached_bytes -= image_bytes(previous)
+                self._entries[key] = img
+                self.cached_bytes += size
+                while self.cached_bytes > self.budget_bytes:
+                    _, cold = self._entries.popitem(last=False)
+                    self.cached_bytes -= image_bytes(cold)
+                METRICS.gauge("image_cache_bytes").set(self.cached_bytes)
+        return img
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.cached_bytes = 0
+            METRICS.gauge("image_cache_bytes").set(0)
+
+    @staticmethod
+    def fit_size(source_size, width, height):
+        scale_ratio = min(width / source_size[0], height / source_size[1])
+        return (max(1, int(source_size[0] * scale_ratio)), max(1, int(source_size[1] * scale_ratio)))
+
+    def _load_scaled(self, image_path, width, height, resample=None):
+        from PIL import Image
+
+        with METRICS.timer("image_decode"):
+            img = Image.open(image_path)
+            target = self.fit_size(img.size, width, height)
+            if img.format == "JPEG":
+                # Let libjpeg decode at 1/2, 1/4 or 1/8 scale, never below the target
+                img.draft("RGB", target)
+            img.load()
+
+        with METRICS.timer("resize"):
+            target = self.fit_size(img.size, width, height)
+            factor = min(img.width // target[0], img.height // target[1])
+            if factor >= 2 and img.mode not in ("P", "1"):
+                # Cheap box reduction first, the LANCZOS pass then only covers the last < 2x
+                img = img.reduce(factor)
+            if img.size != target:
+                img = img.resize(target, Image.Resampling.LANCZOS if resample is None else resample)
+        return img
+
+
+# Process-wide cache shared by all StateManager instances
+SOURCE_IMAGE_CACHE = SourceImageCache()
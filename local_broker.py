@@ -0,0 +1,103 @@
+"""
+In-process stand-in for the Redis client
+
+Implements the small subset of redis-py used by StateManager (publish, pubsub,
+get/set) so several nodes can run in one process without a Redis server.
+"""
+
+import fnmatch
+import queue
+import threading
+import time
+
+
+class LocalPubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.channels = set()
+        self.queue = queue.Queue()
+
+    def subscribe(self, *channels):
+        for channel in channels:
+            self.channels.add(channel)
+            self.broker._register(channel, self)
+            self.queue.put({"type": "subscribe", "channel": channel, "data": len(self.channels)})
+
+    def unsubscribe(self, *channels):
+        for channel in channels or list(self.channels):
+            self.channels.discard(channel)
+            self.broker._unregister(channel, self)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.queue.get(timeout=timeout) if timeout else self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def listen(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                return
+            yield message
+
+    def close(self):
+        self.unsubscribe()
+        self.queue.put(None)
+
+
+class LocalBroker:
+    def __init__(self):
+        self.subscribers = {}
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def _register(self, channel, pubsub):
+        with self._lock:
+            self.subscribers.setdefault(channel, set()).add(pubsub)
+
+    def _unregister(self, channel, pubsub):
+        with self._lock:
+            self.subscribers.get(channel, set()).discard(pubsub)
+
+    def pubsub(self):
+        return LocalPubSub(self)
+
+    def publish(self, channel, data):
+        with self._lock:
+            targets = list(self.subscribers.get(channel, ()))
+        for pubsub in targets:
+            pubsub.queue.put({"type": "message", "channel": channel, "data": data})
+        return len(targets)
+
+    def set(self, key, value, ex=None):
+        expires = time.monotonic() + ex if ex else None
+        with self._lock:
+            self.values[key] = (value, expires)
+        return True
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self.values.get(key, (None, None))
+        if expires and expires < time.monotonic():
+            return None
+        return value
+
+    def scan_iter(self, match="*"):
+        with self._lock:
+            keys = [key for key in self.values if fnmatch.fnmatchcase(key, match)]
+        return iter(keys)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self.values.pop(key, None) is not None)
+
+    def ping(self):
+        return True
+
+    def close(self):
+        """Stop every listener"""
+        with self._lock:
+            pubsubs = {p for subs in self.subscribers.values() for p in subs}
+        for pubsub in pubsubs:
+            pubsub.close()
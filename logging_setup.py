@@ -0,0 +1,122 @@
+"""
+Non-blocking Logging
+
+Log records are put on an in-process queue and written to the console by a
+listener thread, so a slow console or journald never blocks the caller.
+Records are not formatted on the calling thread; a suppressed level costs one
+comparison. Levels are set per module (LOG_LEVELS), repeated warnings of the
+same call site are rate limited, and LOG_FORMAT=json writes one JSON object
+per line with the fields passed via `extra`.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+from config import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_RATE_LIMIT_SEC
+
+# Attributes every LogRecord has; anything else came in via `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "suppressed"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Pass the first warning of a call site per interval and drop the repeats. The next
+    record that passes carries the number of dropped ones in `suppressed`.
+    """
+
+    def __init__(self, interval=LOG_RATE_LIMIT_SEC, min_level=logging.WARNING):
+        super().__init__()
+        self.interval = interval
+        self.min_level = min_level
+        self._last = {}
+        self._suppressed = {}
+
+    def filter(self, record):
+        if record.levelno < self.min_level or not self.interval:
+            return True
+        # Same logger, line and message template: the same warning, whatever its arguments
+        key = (record.name, record.lineno, record.msg)
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return False
+        self._last[key] = now
+        record.suppressed = self._suppressed.pop(key, 0)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Formatting happens on the listener thread, not on the caller's
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        if getattr(record, "suppressed", 0):
+            text += f" ({record.suppressed} similar messages suppressed)"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "at": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_FIELDS)
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def parse_levels(spec):
+    """'wled_controller=DEBUG,scenarios=WARNING' -> {'wled_controller': 'DEBUG', 'scenarios': 'WARNING'}"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level=LOG_LEVEL, levels=LOG_LEVELS, log_format=LOG_FORMAT):
+    """Route all logging through the queue; safe to call more than once"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        console = logging.StreamHandler(sys.stdout)
+        if log_format == "json":
+            console.setFormatter(JsonFormatter())
+        else:
+            console.setFormatter(TextFormatter("[%(levelname)s] %(name)s: %(message)s"))
+
+        records = queue.SimpleQueue()
+        handler = _QueueHandler(records)
+        handler.addFilter(RateLimitFilter())
+        root = logging.getLogger()
+        root.handlers[:] = [handler]
+        root.setLevel(level.upper())
+        for name, module_level in parse_levels(levels).items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = logging.handlers.QueueListener(records, console, respect_handler_level=True)
+        _listener.start()
+        # Write what is still queued before the process ends
+        atexit.register(_listener.stop)
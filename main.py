@@ -1,35 +1,57 @@
 from config.device_roles import DEVICE_ROLE_MAP
+from config import METRICS_PORT, DISPLAY_MODE, ASSET_PORT
+from rig import parse_address, split_instance
+from logging_setup import setup_logging
 import sys
 import socket
 import threading
 import os
 
-from ui.web_ui.selector import WebScenarioSelector
-from ui.web_ui.web_display import WebDeviceDisplay
-
-from state_manager_web import StateManager
+# UI modules (webview, selector) and Pillow are imported lazily, so each role
+# only pays for what it actually uses during startup
 
 
 def main():
     # Force webview to use a specific backend to avoid Qt issues
     os.environ['PYWEBVIEW_GUI'] = 'gtk'
-    
-    allowed_roles = set(DEVICE_ROLE_MAP.values())
+    setup_logging()
+
+    # Map entries and the argument are "role", "role#instance" or "rig/role#instance"
+    allowed_roles = {split_instance(parse_address(address)[1])[0] for address in DEVICE_ROLE_MAP.values()}
 
     if len(sys.argv) == 2:
-        role = sys.argv[1].lower()
+        rig_id, node = parse_address(sys.argv[1].lower())
+        role, instance = split_instance(node)
         if role not in allowed_roles:
             print(f"[ERROR] Ungültige Rolle '{role}'. Erlaubte Rollen: {sorted(allowed_roles)}")
             sys.exit(1)
     else:
         hostname = socket.gethostname().lower()
-        role = DEVICE_ROLE_MAP.get(hostname)
-        if not role:
+        address = DEVICE_ROLE_MAP.get(hostname)
+        if not address:
             print(f"[ERROR] Kein Eintrag für Hostname '{hostname}' gefunden.")
             sys.exit(1)
-        print(f"[INFO] Starte automatisch mit Rolle '{role}' für Hostname '{hostname}'")
+        rig_id, node = parse_address(address)
+        role, instance = split_instance(node)
+        print(f"[INFO] Starte automatisch mit Rolle '{address}' für Hostname '{hostname}'")
+
+    from state_manager_web import StateManager
+    import metrics
 
-    state_manager = StateManager(role, display_mode="web")
+    state_manager = StateManager(role, display_mode=DISPLAY_MODE, rig_id=rig_id, instance=instance)
+
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
+    state_manager.start_metrics_reporting()
+    state_manager.start_heartbeat()
+
+    if state_manager.is_controller:
+        if ASSET_PORT:
+            from asset_sync import AssetPublisher
+            AssetPublisher(state_manager.redis_client, rig=state_manager.rig,
+                           node_id=state_manager.node_id).start()
+    else:
+        state_manager.enable_asset_sync()
 
     # Start listening for state updates in a separate thread
     listener_thread = threading.Thread(
@@ -38,12 +60,13 @@ def main():
     )
     listener_thread.start()
 
-    # Only show UI for main role
-    if role == "main":
+    # Only show UI for the controlling main node, mirrored main screens just display
+    if state_manager.is_controller:
+        from ui.web_ui.selector import WebScenarioSelector
         selector = WebScenarioSelector(state_manager)
         selector.run()
     else:
         state_manager.run_display()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
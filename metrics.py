@@ -0,0 +1,198 @@
+"""
+Lightweight in-process metrics
+
+Histograms, counters and gauges that are cheap enough to stay enabled in
+production, exported as Prometheus text and as a JSON summary.
+"""
+
+import logging
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in seconds, from 100µs up to 5s
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+class Histogram:
+    def __init__(self, name, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Estimate a quantile from the bucket counts (upper bound of the bucket)"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+            maximum = self.max
+        if not total:
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= rank:
+                return self.buckets[index] if index < len(self.buckets) else maximum
+        return maximum
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95)
+        }
+
+
+class Counter:
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(self, name):
+        self.name = name
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="nwt"):
+        self.prefix = prefix
+        self.labels = {}
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        metric = self.histograms.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.histograms.setdefault(name, Histogram(name))
+        return metric
+
+    def counter(self, name):
+        metric = self.counters.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.counters.setdefault(name, Counter(name))
+        return metric
+
+    def gauge(self, name):
+        metric = self.gauges.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.gauges.setdefault(name, Gauge(name))
+        return metric
+
+    @contextmanager
+    def timer(self, stage):
+        """Time a stage into the `<stage>_seconds` histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(stage).observe(time.perf_counter() - started)
+
+    def summary(self):
+        return {
+            "labels": dict(self.labels),
+            "stages": {name: h.snapshot() for name, h in list(self.histograms.items())},
+            "counters": {name: c.value for name, c in list(self.counters.items())},
+            "gauges": {name: g.value for name, g in list(self.gauges.items())}
+        }
+
+    def prometheus_text(self):
+        label_text = ",".join(f'{key}="{value}"' for key, value in sorted(self.labels.items()))
+        lines = []
+
+        for name, hist in sorted(self.histograms.items()):
+            metric = f"{self.prefix}_{name}_seconds"
+            sep = "," if label_text else ""
+            lines.append(f"# TYPE {metric} histogram")
+            with hist._lock:
+                counts = list(hist.counts)
+                total, total_sum = hist.count, hist.sum
+            cumulative = 0
+            for bound, count in zip(hist.buckets, counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{label_text}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label_text}{sep}le="+Inf"}} {total}')
+            lines.append(f"{metric}_sum{{{label_text}}} {total_sum}")
+            lines.append(f"{metric}_count{{{label_text}}} {total}")
+
+        for name, counter in sorted(self.counters.items()):
+            metric = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{label_text}}} {counter.value}")
+
+        for name, gauge in sorted(self.gauges.items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric}{{{label_text}}} {gauge.value}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by all modules
+METRICS = MetricsRegistry()
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve the registry as Prometheus text on http://host:port/metrics"""
+    # Imported here, http.server is only needed when the endpoint is enabled
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = METRICS.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning("Metrics endpoint could not be started on %s:%s: %s", host, port, e)
+        return None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
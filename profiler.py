@@ -0,0 +1,207 @@
+"""
+Step Profiler
+
+Samples the stacks of the threads working on a step (the state actor in
+handle_state_change, the render workers in the render path) every few
+milliseconds for the next N steps. Only threads inside a profiled section are
+sampled and every sample is tagged with the step it belongs to, so idle
+listener or heartbeat threads never show up. Sampling instead of tracing
+keeps the overhead low enough to run on a Pi during a class.
+
+The result holds collapsed stacks ("step;outer;...;inner count", the input
+of flamegraph.pl and speedscope) and a summary per step naming the hottest
+functions.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from config import PROFILE_INTERVAL_MS, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Results stay in Redis for the admin panel this long
+RESULT_TTL_SEC = 24 * 3600
+# Functions named per step in the summary
+HOTTEST = 5
+# Quiet time after the last step before the profile is finished, so its render is included
+LINGER_SEC = 0.5
+# A node that gets no step for this long ends the profile with the steps it has
+IDLE_TIMEOUT_SEC = 300
+MAX_DEPTH = 64
+
+
+def step_label(scenario, step):
+    return f"{scenario or 'role_image'}:{step}"
+
+
+def _frame_name(code, names={}):
+    name = names.get(code)
+    if name is None:
+        # co_qualname is new in Python 3.11, the Pis run older versions
+        qualname = getattr(code, "co_qualname", code.co_name)
+        name = names[code] = f"{qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name
+
+
+class StepProfiler:
+    """Samples the profiled sections of the next `steps` steps, then calls on_finish(profiler)"""
+
+    def __init__(self, steps, interval_ms=PROFILE_INTERVAL_MS, on_finish=None):
+        self.steps = steps
+        self.remaining = steps
+        self.interval = interval_ms / 1000
+        self.on_finish = on_finish
+        self.started_at = time.time()
+        self.stacks = Counter()
+        self.labels = []
+        # Thread ident -> step label of the section it is in
+        self._active = {}
+        self._wake = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="profiler")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @contextmanager
+    def step(self, label):
+        """Profile one step on the state actor; steps after the last one are not sampled"""
+        if self.remaining <= 0 or self._finished:
+            yield
+            return
+        self.remaining -= 1
+        self.labels.append(label)
+        with self.section(label):
+            yield
+
+    @contextmanager
+    def section(self, label):
+        """Sample the calling thread as working on `label` (render workers, prefetch)"""
+        if self._finished:
+            yield
+            return
+        ident = threading.get_ident()
+        previous = self._active.get(ident)
+        self._active[ident] = label
+        self._wake.set()
+        try:
+            yield
+        finally:
+            if previous is None:
+                self._active.pop(ident, None)
+            else:
+                self._active[ident] = previous
+
+    def _run(self):
+        idle_since = None
+        while True:
+            active = dict(self._active)
+            if active:
+                idle_since = None
+                frames = sys._current_frames()
+                for ident, label in active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self._sample(label, frame)
+            elif self.remaining > 0:
+                # Nothing to sample until the next step starts
+                if not self._wake.wait(IDLE_TIMEOUT_SEC):
+                    logger.warning("Profiler: no step for %ds, finishing after %d of %d steps",
+                                   IDLE_TIMEOUT_SEC, self.steps - self.remaining, self.steps)
+                    break
+                self._wake.clear()
+                continue
+            elif idle_since is None:
+                idle_since = time.monotonic()
+            elif time.monotonic() - idle_since >= LINGER_SEC:
+                break
+            time.sleep(self.interval)
+        self._finished = True
+        if self.on_finish:
+            self.on_finish(self)
+
+    def _sample(self, label, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            stack.append(_frame_name(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[(label, tuple(stack))] += 1
+
+    def collapsed(self):
+        """Collapsed stacks, one "step;outer;...;inner count" line per distinct stack"""
+        return "\n".join(
+            f"{label};{';'.join(stack)} {count}"
+            for (label, stack), count in sorted(self.stacks.items())
+        )
+
+    def summary(self):
+        """Per step: samples, sampled thread time and the hottest functions (self and total)"""
+        per_step = {}
+        for (label, stack), count in self.stacks.items():
+            entry = per_step.setdefault(label, {"samples": 0, "self": Counter(), "total": Counter()})
+            entry["samples"] += count
+            entry["self"][stack[-1]] += count
+            for name in set(stack):
+                entry["total"][name] += count
+        labels = self.labels + [label for label in per_step if label not in self.labels]
+        steps = []
+        for label in labels:
+            entry = per_step.get(label)
+            if entry is None:
+                steps.append({"step": label, "samples": 0, "sampled_ms": 0.0, "self": [], "total": []})
+                continue
+            steps.append({
+                "step": label,
+                "samples": entry["samples"],
+                "sampled_ms": round(entry["samples"] * self.interval * 1000, 1),
+                "self": entry["self"].most_common(HOTTEST),
+                # Frames on every stack of the step (thread entry, actor loop) say nothing
+                "total": [item for item in entry["total"].most_common()
+                          if item[1] < entry["samples"]][:HOTTEST]
+            })
+        return steps
+
+    def result(self):
+        return {
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "interval_ms": self.interval * 1000,
+            "steps": self.summary(),
+            "collapsed": self.collapsed()
+        }
+
+
+def save_profile(result, name, directory=PROFILE_DIR):
+    """Write <name>_<stamp>.collapsed and .json, return the .collapsed path or None"""
+    if not directory:
+        return None
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(directory, f"profile_{name.replace('#', '-').replace('/', '_')}_{stamp}")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(result["collapsed"] + "\n")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({key: value for key, value in result.items() if key != "collapsed"}, f, indent=2)
+    except OSError as e:
+        logger.warning("Profile could not be saved: %s", e)
+        return None
+    return base + ".collapsed"
+
+
+def log_summary(name, steps):
+    for step in steps:
+        hottest = ", ".join(
+            f"{function} {count * 100 // max(1, step['samples'])}%" for function, count in step["self"][:3]
+        )
+        logger.info("Profile %s step %s: %.0fms sampled, hottest: %s",
+                    name, step["step"], step["sampled_ms"], hottest or "-")
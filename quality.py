@@ -0,0 +1,91 @@
+"""
+Render Quality Governor
+
+Watches how long a node takes to render a frame against the render budget of
+the deployment. When renders keep exceeding it (thermal throttling, a busy
+Pi) quality is lowered one level at a time: a faster resample filter, then a
+cheaper PNG compression, then a reduced render resolution that the browser
+scales up. When renders are well within the budget again, quality comes back
+one level at a time. Every change is reported in the metrics.
+"""
+
+import logging
+import threading
+from collections import deque
+
+from config import RENDER_BUDGET_MS
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Pillow filter names, mapped in resample_filter()
+QUALITY_LEVELS = (
+    {"name": "full", "resample": "LANCZOS", "compress_level": 6, "scale": 1.0},
+    {"name": "fast_resample", "resample": "BILINEAR", "compress_level": 6, "scale": 1.0},
+    {"name": "fast_encode", "resample": "BILINEAR", "compress_level": 1, "scale": 1.0},
+    {"name": "reduced_resolution", "resample": "BILINEAR", "compress_level": 1, "scale": 0.75},
+    {"name": "half_resolution", "resample": "BILINEAR", "compress_level": 1, "scale": 0.5},
+)
+
+# Consecutive renders over budget before degrading, and well within it before recovering
+DEGRADE_AFTER = 3
+RECOVER_AFTER = 20
+# Within budget means below this share of it, so levels do not flap at the edge
+RECOVER_RATIO = 0.5
+
+
+def resample_filter(name):
+    from PIL import Image
+    return getattr(Image.Resampling, name)
+
+
+class QualityGovernor:
+    def __init__(self, budget_ms=RENDER_BUDGET_MS):
+        # 0 disables the governor, quality stays at full
+        self.budget = budget_ms / 1000
+        self.level = 0
+        self._recent = deque(maxlen=RECOVER_AFTER)
+        self._lock = threading.Lock()
+
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self.level]
+
+    @property
+    def resample(self):
+        return resample_filter(self.settings["resample"])
+
+    @property
+    def compress_level(self):
+        return self.settings["compress_level"]
+
+    def scaled(self, size):
+        """Render size for a display size at the current level"""
+        scale = self.settings["scale"]
+        if scale == 1.0:
+            return size
+        return max(1, int(size[0] * scale)), max(1, int(size[1] * scale))
+
+    def observe(self, seconds):
+        """Record the duration of one render (frame store misses only)"""
+        if not self.budget:
+            return
+        with self._lock:
+            self._recent.append(seconds)
+            recent = list(self._recent)
+            if len(recent) >= DEGRADE_AFTER and all(value > self.budget for value in recent[-DEGRADE_AFTER:]):
+                if self.level + 1 < len(QUALITY_LEVELS):
+                    self._change(self.level + 1, recent[-1])
+            elif len(recent) == RECOVER_AFTER and all(value < self.budget * RECOVER_RATIO for value in recent):
+                if self.level > 0:
+                    self._change(self.level - 1, max(recent))
+
+    def _change(self, level, seconds):
+        degraded = level > self.level
+        self.level = level
+        # Judge the new level on its own renders only
+        self._recent.clear()
+        METRICS.gauge("quality_level").set(level)
+        METRICS.counter("quality_degradations" if degraded else "quality_recoveries").inc()
+        logger.log(logging.WARNING if degraded else logging.INFO, "Render quality %s to '%s' (%.0fms, budget %.0fms)",
+                   "lowered" if degraded else "raised", self.settings["name"], seconds * 1000, self.budget * 1000)
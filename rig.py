@@ -0,0 +1,55 @@
+"""
+Rig Namespaces
+
+Several classroom rigs can share one Redis broker. Each rig gets its own
+channel and its own snapshot and heartbeat keys, and nodes are addressed as
+"rig/role". Nodes only subscribe to their rig's channel, so traffic of one rig
+is never delivered to (or processed by) the nodes of another.
+
+A role can have several screens: "router#2" is the second instance of the
+router role. Every instance gets the same messages and resolves its content
+locally (step table lines for "router#2" override those for "router").
+"""
+
+from config import RIG_ID, REDIS_CHANNEL
+
+
+def parse_address(address, default_rig=RIG_ID):
+    """Split "rig/role" into (rig, role); a plain role belongs to `default_rig`"""
+    rig, _, role = address.rpartition("/")
+    return (rig or default_rig), role
+
+
+def format_address(rig, role):
+    return f"{rig}/{role}" if rig else role
+
+
+def split_instance(node):
+    """Split "role#instance" into (role, instance); a plain role is instance "1" """
+    role, _, instance = node.partition("#")
+    return role, (instance or "1")
+
+
+def format_node(role, instance="1"):
+    return role if str(instance) == "1" else f"{role}#{instance}"
+
+
+class RigNamespace:
+    def __init__(self, rig_id=RIG_ID):
+        self.rig_id = rig_id or ""
+
+    @property
+    def channel(self):
+        # Without a rig id the original channel name is kept, single-rig setups stay compatible
+        return f"{REDIS_CHANNEL}:{self.rig_id}" if self.rig_id else REDIS_CHANNEL
+
+    def key(self, name):
+        """Redis key for per-rig data, e.g. key("state") or key("heartbeat:switch@rpi3")"""
+        return f"nwt:{self.rig_id}:{name}" if self.rig_id else f"nwt:{name}"
+
+    def heartbeat_key(self, node):
+        """Heartbeat key of a node, e.g. "router#2@rpi7" (node name and host)"""
+        return self.key(f"heartbeat:{node}")
+
+    def address(self, role):
+        return format_address(self.rig_id, role)
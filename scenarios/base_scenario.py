@@ -12,7 +12,12 @@ class BaseScenario:
         self.state["step"] = step
         method_name = f"step_{step}"
         if hasattr(self, method_name):
-            x = getattr(self, method_name)()
-            print(f'return value: {x}')
-            return x
+            return getattr(self, method_name)()
         return None  # Return None if step doesn't exist
+
+    def resolve(self, step, role=None):
+        """
+        Return (content, actions) like TxtScenario.resolve. Legacy step methods drive
+        their hardware themselves, so no actions are reported and `role` is ignored.
+        """
+        return self.execute_step(step), []
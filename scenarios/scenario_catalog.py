@@ -0,0 +1,159 @@
+"""
+Scenario Catalog
+
+Index of all scenarios for the selector menu: parsed metadata (steps, devices,
+duration) and a small thumbnail per scenario. The catalog is persisted as JSON
+and an entry is only rebuilt when the mtime of its scenario file changes, so
+opening the menu never parses scenario files again.
+"""
+
+import logging
+import base64
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from config import SCENARIO_CATALOG_PATH
+from metrics import METRICS
+from scenarios.scenario_loader import ScenarioLoader
+
+logger = logging.getLogger(__name__)
+
+# Bump when the entry layout or thumbnail rendering changes
+CATALOG_VERSION = 1
+THUMBNAIL_SIZE = (256, 144)
+
+# Menu labels of the scenarios we ship, others are named after their file
+SCENARIO_LABELS = {
+    "http_level_1": "ORF Phase 1 Newbie",
+    "http_level_2": "ORF Phase 2 Krypto",
+    "http_level_3": "ORF Phase 3 NWT Lab",
+}
+
+
+class ScenarioCatalog:
+    def __init__(self, renderer, scenarios_dir="scenarios", cache_path=SCENARIO_CATALOG_PATH, max_workers=4):
+        """`renderer` is a StateManager, used offline to render thumbnails"""
+        self.renderer = renderer
+        self.scenarios_dir = scenarios_dir
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def entries(self) -> List[Dict]:
+        """All scenarios in menu order, rebuilding only entries whose file changed"""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load_cache()
+
+            sources = {}
+            for _, scenario_id in ScenarioLoader.get_available_scenarios():
+                path = self._source_path(scenario_id)
+                if path:
+                    sources[scenario_id] = (path, os.stat(path).st_mtime_ns)
+
+            stale = [
+                scenario_id for scenario_id, (_, mtime) in sources.items()
+                if self._entries.get(scenario_id, {}).get("mtime_ns") != mtime
+            ]
+            removed = set(self._entries) - set(sources)
+            if stale:
+                with METRICS.timer("catalog_build"):
+                    with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                        built = pool.map(lambda scenario_id: self._build_entry(scenario_id, *sources[scenario_id]), stale)
+                        for scenario_id, entry in zip(stale, built):
+                            self._entries[scenario_id] = entry
+            for scenario_id in removed:
+                del self._entries[scenario_id]
+            if stale or removed:
+                self._save_cache()
+
+            return sorted(
+                (entry for scenario_id, entry in self._entries.items()
+                 if scenario_id in sources and not entry.get("error")),
+                key=lambda entry: (entry["legacy"], entry["id"])
+            )
+
+    def _source_path(self, scenario_id) -> Optional[str]:
+        for extension in (".txt", ".py"):
+            path = os.path.join(self.scenarios_dir, scenario_id + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _build_entry(self, scenario_id, path, mtime_ns) -> Dict:
+        """Catalog entry of a scenario; failures are kept as error entries until the file changes"""
+        from scenarios.scenario_parser import TxtScenario
+
+        legacy = path.endswith(".py")
+        try:
+            txt_path = path
+            if legacy:
+                from scenarios.scenario_converter import compile_legacy_scenario
+                txt_path = compile_legacy_scenario(path)
+                if txt_path is None:
+                    return {"id": scenario_id, "mtime_ns": mtime_ns, "error": "compile failed"}
+            scenario = TxtScenario("main", txt_path)
+
+            devices = set()
+            for actual_step in scenario.valid_steps:
+                # "router#2" is another screen of the router
+                devices.update(line.device.lower().split('#')[0] for line in scenario.steps.get(actual_step, []))
+            duration = sum(scenario.step_durations())
+
+            return {
+                "id": scenario_id,
+                "label": SCENARIO_LABELS.get(scenario_id, scenario_id.replace('_', ' ').title()),
+                "legacy": legacy,
+                "mtime_ns": mtime_ns,
+                "steps": scenario.maximum_steps,
+                "devices": sorted(devices - {"all"}),
+                "duration_sec": round(duration, 1),
+                "thumbnail": self._thumbnail(scenario)
+            }
+        except Exception as e:
+            logger.warning("Catalog entry for '%s' failed: %s", scenario_id, e)
+            return {"id": scenario_id, "mtime_ns": mtime_ns, "error": str(e)}
+
+    def _thumbnail(self, scenario) -> str:
+        """
+        JPEG data URI of the first step whose main screen shows an existing image,
+        else of the first text screen, "" if there is neither
+        """
+        contents = [scenario.resolve(step)[0] for step in range(scenario.maximum_steps)]
+        images = [c for c in contents if c.get("type") in ("image", "image_with_text")
+                  and os.path.exists(c.get("image") or c.get("content"))]
+        texts = [c for c in contents if c.get("type") == "text"]
+        content = (images or texts or [None])[0]
+        if content is None:
+            return ""
+        img = self.renderer.render_display_image(content, THUMBNAIL_SIZE)
+        if img is None:
+            return ""
+        buffered = BytesIO()
+        img.convert("RGB").save(buffered, format="JPEG", quality=80)
+        return f"data:image/jpeg;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CATALOG_VERSION:
+                return data["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CATALOG_VERSION, "entries": self._entries}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning("Scenario catalog could not be saved: %s", e)
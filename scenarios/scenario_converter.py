@@ -1,68 +1,219 @@
 """
 Scenario Converter Utility
 
-This module helps convert legacy Python scenarios to the new text-based format.
+This module compiles legacy Python scenarios into the text-based format.
+The legacy Scenario class is run for every role and step in a sandboxed
+subprocess (LED commands are recorded, never sent) and the returned contents
+are written as an equivalent step table.
 """
 
+import contextlib
+import importlib.util
+import json
+import logging
 import os
-import inspect
+import subprocess
+import sys
+import tempfile
 from typing import Dict, List, Optional
 
+from config import ROLES, SCENARIO_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Roles a legacy scenario is recorded for; "client" appears in step tables and LED connections
+RECORD_ROLES = sorted(set(ROLES) | {"client"})
+
+
+def _load_module(python_file_path: str):
+    module_name = os.path.basename(python_file_path).replace('.py', '')
+    spec = importlib.util.spec_from_file_location(module_name, python_file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _record_scenario(python_file_path: str, roles: List[str]) -> Dict:
+    """
+    Sandbox side: run the legacy Scenario for every role and step.
+    Returns {"name", "description", "roles": {role: [{"content", "wled"}]}}.
+    """
+    import wled_controller
+    from scenarios.base_scenario import BaseScenario
+
+    calls = []
+
+    class RecordingController:
+        def __init__(self, ip_address, channel=1):
+            self.connection = [ip_address, channel]
+
+        def turn_on(self, reverse=False):
+            calls.append({"connection": self.connection, "reverse": bool(reverse)})
+
+    # Legacy steps import the controller themselves, they get the recorder instead
+    wled_controller.WledController = RecordingController
+
+    # Anything the legacy code prints must not end up in the recording
+    with contextlib.redirect_stdout(sys.stderr):
+        module = _load_module(python_file_path)
+        result = {"name": None, "description": None, "roles": {}}
+        for role in roles:
+            scenario = module.Scenario(role)
+            # Values inherited from BaseScenario say nothing about this scenario
+            defaults = BaseScenario(role)
+            name = getattr(scenario, "name", None)
+            if name and name != defaults.name:
+                result["name"] = result["name"] or name
+            description = getattr(scenario, "description", None)
+            if not description or description == defaults.description:
+                description = (type(scenario).__doc__ or "").strip().split("\n")[0].strip() or None
+            result["description"] = result["description"] or description
+            steps = []
+            for step in range(getattr(scenario, "maximum_steps", 0)):
+                calls.clear()
+                content = scenario.execute_step(step)
+                steps.append({"content": content, "wled": list(calls)})
+            result["roles"][role] = steps
+    return result
+
+
 class ScenarioConverter:
     """Convert Python scenarios to text format"""
-    
+
+    @staticmethod
+    def record_python_scenario(python_file_path: str, roles: List[str] = RECORD_ROLES,
+                               timeout: float = 60) -> Optional[Dict]:
+        """Run a legacy scenario in a subprocess with LEDs disabled, None on failure"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "recording.json")
+            command = [
+                sys.executable, "-m", "scenarios.scenario_converter",
+                "--record", os.path.abspath(python_file_path), ",".join(roles), output_path
+            ]
+            env = dict(os.environ, WLED_ENABLED="0")
+            try:
+                completed = subprocess.run(command, cwd=REPO_ROOT, env=env, timeout=timeout,
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            except subprocess.TimeoutExpired:
+                logger.error("Recording %s timed out after %ss", python_file_path, timeout)
+                return None
+            if completed.returncode != 0:
+                logger.error("Recording %s failed:\n%s", python_file_path, completed.stderr.strip())
+                return None
+            with open(output_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+    @staticmethod
+    def _content_fields(content, role: str):
+        """Map a recorded step result to the (image, desc) columns of a step table line"""
+        if content is None:
+            # The display falls back to the device image for empty legacy results
+            return f"images/devices/{role}.png", None
+        if isinstance(content, dict):
+            content_type = content.get("type")
+            if content_type == "image":
+                return content["content"], None
+            if content_type == "text":
+                return "TEXT", content["content"]
+            if content_type == "image_with_text":
+                return content["image"], content["text"]
+            return None, None
+        if content.startswith("TEXT:"):
+            return "TEXT", content[5:]
+        return content, None
+
     @staticmethod
-    def convert_python_to_txt(python_file_path: str, output_file_path: str) -> bool:
+    def _wled_command(role: str, calls: List[Dict], scenario_name: str, step: int) -> Optional[str]:
+        """Translate recorded controller calls of one role and step into a source>target command"""
+        from wled_controller import WLED_CONNECTIONS
+
+        commands = []
+        for call in calls:
+            connection = tuple(call["connection"])
+            candidates = [pair for pair, target in WLED_CONNECTIONS.items() if target == connection]
+            # The source node plays the playlist forward, the target node in reverse
+            matching = [(source, target) for source, target in candidates
+                        if (target if call["reverse"] else source) == role]
+            if not matching:
+                logger.warning("%s step %d: no connection of '%s' on WLED %s channel %s, dropped",
+                               scenario_name, step, role, connection[0], connection[1])
+                continue
+            commands.append(f"{matching[0][0]}>{matching[0][1]}")
+        if len(commands) > 1:
+            logger.warning("%s step %d: '%s' sends %d LED commands, a step table line holds one, keeping %s",
+                           scenario_name, step, role, len(commands), commands[0])
+        return commands[0] if commands else None
+
+    @staticmethod
+    def _field(value: Optional[str], context: Optional[str] = None) -> str:
+        # Semicolons separate columns and every line is one step entry
+        field = (value or "").replace(";", ",").replace("\r", " ").replace("\n", " ").strip()
+        if context and field != (value or "").strip():
+            logger.warning("%s: a step table field holds no ';' or line breaks, %r written as %r",
+                           context, value, field)
+        return field
+
+    @staticmethod
+    def convert_python_to_txt(python_file_path: str, output_file_path: str, timeout: float = 60) -> bool:
         """
-        Convert a Python scenario file to text format
-        This is a helper for manual conversion - automatic conversion is complex
-        due to the varied structure of Python scenarios.
+        Convert a Python scenario file to text format by recording what its Scenario
+        class returns for every role and step. Every step gets an explicit main line,
+        so the description rules of the text format do not change what is shown.
         """
-        
+
         if not os.path.exists(python_file_path):
-            print(f"Error: Python file not found: {python_file_path}")
+            logger.error("Python file not found: %s", python_file_path)
             return False
-        
-        try:
-            # Load the Python module
-            module_name = os.path.basename(python_file_path).replace('.py', '')
-            spec = importlib.util.spec_from_file_location(module_name, python_file_path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            
-            if not hasattr(module, 'Scenario'):
-                print(f"Error: No Scenario class found in {python_file_path}")
-                return False
-            
-            scenario_class = module.Scenario
-            
-            # Create template with basic info
-            template = f"""# {getattr(scenario_class, 'name', 'Converted Scenario')}
-# {getattr(scenario_class, 'description', 'Converted from Python scenario')}
-# Format: step;device;image(opt);wled(opt);time_sec(default=5);desc(opt);
 
-# MANUAL CONVERSION REQUIRED
-# This is a template - you need to manually convert the Python logic
-# Original maximum_steps: {getattr(scenario_class, 'maximum_steps', 'unknown')}
+        recording = ScenarioConverter.record_python_scenario(python_file_path, timeout=timeout)
+        if recording is None:
+            return False
 
-# Add your scenario steps here following the format:
-# step;device;image;wled;time_sec;description;
+        scenario_name = os.path.basename(python_file_path)
+        # Same defaults as a TxtScenario without header, named after the compiled file
+        txt_name = os.path.splitext(scenario_name)[0] + ".txt"
+        roles = recording["roles"]
+        maximum_steps = max((len(steps) for steps in roles.values()), default=0)
+        field = ScenarioConverter._field
+
+        lines = [
+            f"# {recording['name'] or txt_name.replace('.txt', '').replace('_', ' ').title()}",
+            f"# {recording['description'] or f'Scenario loaded from {txt_name}'}",
+            f"# Compiled from {scenario_name}, do not edit (regenerated when the .py changes)",
+            "# Format: step;device;image(opt);wled(opt);time_sec(default=5);desc(opt);",
+            ""
+        ]
+        for step in range(maximum_steps):
+            # main first, so the main line exists for every step
+            for role in sorted(roles, key=lambda r: (r != "main", r)):
+                if step >= len(roles[role]):
+                    continue
+                recorded = roles[role][step]
+                image, desc = ScenarioConverter._content_fields(recorded["content"], role)
+                if role == "main" and not image and not desc:
+                    # An empty main screen still makes it a step, TxtScenario drops steps without content
+                    image = "EMPTY"
+                if image and image not in ("TEXT", "EMPTY") and not image.startswith("images/"):
+                    logger.warning("%s step %d: image '%s' is outside images/, the step table resolves it as images/%s",
+                                   scenario_name, step, image, image)
+                wled = ScenarioConverter._wled_command(role, recorded["wled"], scenario_name, step)
+                if role != "main" and not image and not desc and not wled:
+                    continue
+                context = f"{scenario_name} step {step} ({role})"
+                lines.append(f"{step};{role};{field(image, context)};{field(wled)};;{field(desc, context)};")
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_file_path)), exist_ok=True)
+        tmp_path = output_file_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        # Atomic replace, nodes compiling at the same time never read half a file
+        os.replace(tmp_path, output_file_path)
+
+        logger.info("Compiled %s: %d steps, %d roles", scenario_name, maximum_steps, len(roles))
+        return True
 
-0;main;000_init.png;;;Scenario initialization;
-# Add more steps...
-"""
-            
-            with open(output_file_path, 'w', encoding='utf-8') as f:
-                f.write(template)
-            
-            print(f"Template created at {output_file_path}")
-            print("Manual conversion required - please fill in the actual scenario steps")
-            return True
-            
-        except Exception as e:
-            print(f"Error converting scenario: {e}")
-            return False
-    
     @staticmethod
     def analyze_python_scenario(python_file_path: str) -> Dict:
         """
@@ -109,19 +260,56 @@ class ScenarioConverter:
             return analysis
             
         except Exception as e:
-            print(f"Error analyzing scenario: {e}")
+            logger.error("Error analyzing scenario: %s", e)
             return analysis
 
+def _compiled_path(python_file_path: str, output_dir: str) -> str:
+    scenario_id = os.path.basename(python_file_path).replace('.py', '')
+    return os.path.join(output_dir, f"{scenario_id}.txt")
+
+
+def compiled_legacy_scenario(python_file_path: str, output_dir: str = SCENARIO_CACHE_DIR) -> Optional[str]:
+    """Path of the compiled step table of a legacy scenario if it is up to date, else None (never compiles)"""
+    output_file_path = _compiled_path(python_file_path, output_dir)
+    try:
+        if os.path.getmtime(output_file_path) >= os.path.getmtime(python_file_path):
+            return output_file_path
+    except OSError:
+        pass
+    return None
+
+
+def compile_legacy_scenario(python_file_path: str, output_dir: str = SCENARIO_CACHE_DIR) -> Optional[str]:
+    """
+    Return the path of the compiled step table of a legacy scenario, compiling it
+    if missing or older than the .py file. None if it cannot be compiled.
+    """
+    compiled = compiled_legacy_scenario(python_file_path, output_dir)
+    if compiled:
+        return compiled
+    output_file_path = _compiled_path(python_file_path, output_dir)
+    if ScenarioConverter.convert_python_to_txt(python_file_path, output_file_path):
+        return output_file_path
+    return None
+
 def main():
     """Command line utility for converting scenarios"""
-    import sys
-    
+    if len(sys.argv) == 5 and sys.argv[1] == "--record":
+        # Sandbox entry point, see ScenarioConverter.record_python_scenario
+        recording = _record_scenario(sys.argv[2], sys.argv[3].split(","))
+        with open(sys.argv[4], "w", encoding="utf-8") as f:
+            json.dump(recording, f)
+        return
+
     if len(sys.argv) != 3:
-        print("Usage: python scenario_converter.py <input.py> <output.txt>")
+        print("Usage: python -m scenarios.scenario_converter <input.py> <output.txt>")
         sys.exit(1)
     
     input_file = sys.argv[1]
     output_file = sys.argv[2]
+
+    from logging_setup import setup_logging
+    setup_logging()
     
     converter = ScenarioConverter()
     
@@ -135,13 +323,12 @@ def main():
     print(f"Roles Found: {', '.join(analysis['roles'])}")
     print(f"Step Methods: {', '.join(analysis['step_methods'])}")
     
-    # Create template
-    print(f"\nCreating template at {output_file}...")
+    # Compile
+    print(f"\nCompiling to {output_file}...")
     if converter.convert_python_to_txt(input_file, output_file):
-        print("Template created successfully!")
-        print("Please manually convert the Python logic to text format.")
+        print("Scenario compiled successfully!")
     else:
-        print("Failed to create template.")
+        print("Failed to compile scenario.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -47,6 +47,10 @@ class ScenarioLoader:
             # Skip base scenario and __init__ files
             if scenario_id in ['base_scenario', '__init__'] or scenario_id.startswith('.'):
                 continue
+
+            # Skip helper modules of this package, only files defining a Scenario class count
+            if not ScenarioLoader._defines_scenario_class(py_file):
+                continue
                 
             # Skip if we already have a txt version
             txt_equivalent = os.path.join(scenarios_dir, f"{scenario_id}.txt")
@@ -58,6 +62,14 @@ class ScenarioLoader:
         
         return sorted(scenarios)
     
+    @staticmethod
+    def _defines_scenario_class(py_file: str) -> bool:
+        try:
+            with open(py_file, 'r', encoding='utf-8') as f:
+                return any(line.startswith('class Scenario') and line[14:15] in ('(', ':') for line in f)
+        except OSError:
+            return False
+
     @staticmethod
     def validate_scenario_file(file_path: str) -> Dict[str, Any]:
         """
@@ -1,6 +1,10 @@
+import logging
+import json
 import os
 from typing import Dict, List, Optional, Tuple
 
+logger = logging.getLogger(__name__)
+
 class ScenarioStep:
     def __init__(self, step: int, device: str, image: Optional[str] = None, 
                  wled: Optional[str] = None, time_sec: float = 5.0, desc: Optional[str] = None):
@@ -12,8 +16,10 @@ class ScenarioStep:
         self.desc = desc
 
 class TxtScenario:
-    def __init__(self, role: str, txt_file_path: str):
+    def __init__(self, role: str, txt_file_path: str, instance: str = "1"):
         self.role = role
+        # Screen number within the role, lines for "role#instance" override those for "role"
+        self.instance = str(instance)
         self.txt_file_path = txt_file_path
         self.steps: Dict[int, List[ScenarioStep]] = {}
         self.maximum_steps = 0
@@ -28,7 +34,7 @@ class TxtScenario:
     def _parse_txt_file(self):
         """Parse the txt file and create scenario steps"""
         if not os.path.exists(self.txt_file_path):
-            print(f"Warning: Scenario file {self.txt_file_path} not found")
+            logger.warning("Scenario file %s not found", self.txt_file_path)
             return
 
         with open(self.txt_file_path, 'r', encoding='utf-8') as f:
@@ -50,7 +56,7 @@ class TxtScenario:
                 
                 # Ensure we have at least step and device
                 if len(parts) < 2:
-                    print(f"Warning: Invalid line {line_num} in {self.txt_file_path}: {line}")
+                    logger.warning("Invalid line %d in %s: %s", line_num, self.txt_file_path, line)
                     continue
 
                 # Parse required fields
@@ -58,7 +64,7 @@ class TxtScenario:
                 device = parts[1] if parts[1] else ""
                 
                 if not device:
-                    print(f"Warning: Missing device on line {line_num}: {line}")
+                    logger.warning("Missing device on line %d in %s: %s", line_num, self.txt_file_path, line)
                     continue
 
                 # Parse optional fields with defaults
@@ -71,7 +77,7 @@ class TxtScenario:
                     try:
                         time_sec = float(parts[4])
                     except ValueError:
-                        print(f"Warning: Invalid time_sec on line {line_num}, using default 5.0")
+                        logger.warning("Invalid time_sec on line %d in %s, using default 5.0", line_num, self.txt_file_path)
                 
                 desc = parts[5] if len(parts) > 5 and parts[5] else None
 
@@ -87,7 +93,7 @@ class TxtScenario:
                 valid_steps.add(step)
 
             except (ValueError, IndexError) as e:
-                print(f"Error parsing line {line_num} in {self.txt_file_path}: {line} - {e}")
+                logger.error("Error parsing line %d in %s: %s - %s", line_num, self.txt_file_path, line, e)
 
         # Filter out steps that have no meaningful content for any device
         meaningful_steps = set()
@@ -116,6 +122,8 @@ class TxtScenario:
             self.maximum_steps = 1
             self.valid_steps = [0]
 
+        self._compute_step_outputs()
+
     def get_actual_step_number(self, navigation_step: int) -> int:
         """Convert navigation step (0-based index) to actual step number"""
         if navigation_step < 0 or navigation_step >= len(self.valid_steps):
@@ -129,8 +137,95 @@ class TxtScenario:
         except ValueError:
             return 0
 
+    def step_durations(self) -> List[float]:
+        """Seconds each navigation step stays on screen; lines of a step run in parallel, the longest sets the pace"""
+        return [max((line.time_sec for line in self.steps.get(actual_step, [])), default=5.0)
+                for actual_step in self.valid_steps]
+
     def execute_step(self, step: int) -> Optional[Dict]:
-        """Execute step based on role and return display content"""
+        """Execute step based on role and return display content (runs its actions right away)"""
+        from action_dispatcher import run_actions
+
+        content, actions = self.resolve(step)
+        run_actions(actions)
+        return content
+
+    def resolve(self, step: int, role: Optional[str] = None, instance: Optional[str] = None) -> Tuple[Dict, List[Dict]]:
+        """
+        Return the display content of a navigation step for a role and instance (default:
+        own role and instance) together with its side-effect actions. Pure: nothing is sent anywhere.
+        """
+        if instance is None:
+            instance = self.instance if role is None else "1"
+        role = (role or self.role).lower()
+        instance = str(instance)
+        content = self._resolve_step(step, role, instance)
+        actions = []
+        # Every LED line of the step counts, the same lines wled_state folds for a seek
+        for scenario_step in self.steps.get(self.get_actual_step_number(step), []):
+            if scenario_step.wled and self._sends_led(scenario_step.device, role, instance):
+                action = self._wled_action(scenario_step.wled, role)
+                if action:
+                    actions.append(action)
+        return content, actions
+
+    def wled_state(self, step: int) -> Dict[str, Dict]:
+        """
+        LED state at a navigation step: the last WLED command of every connection,
+        folded from the start of the scenario, with the device whose line holds it.
+        Connections are ordered by their last command, the order led_actions replays
+        them in, so strips sharing a controller end up as after stepping through.
+        """
+        state = {}
+        for actual_step in self.valid_steps[:step + 1]:
+            for scenario_step in self.steps.get(actual_step, []):
+                if not scenario_step.wled or '>' not in scenario_step.wled:
+                    continue
+                source, target = (part.strip().lower() for part in scenario_step.wled.split('>', 1))
+                connection = '-'.join(sorted((source, target)))
+                # Re-lit connections move to the end
+                state.pop(connection, None)
+                state[connection] = {
+                    "device": scenario_step.device.lower(),
+                    "command": scenario_step.wled
+                }
+        return state
+
+    def led_actions(self, wled_state: Dict[str, Dict], role: Optional[str] = None) -> List[Dict]:
+        """Actions that put this role's part of a folded LED state (see wled_state) on the strips"""
+        role = (role or self.role).lower()
+        actions = []
+        for entry in wled_state.values():
+            if not self._sends_led(entry["device"], role, self.instance):
+                continue
+            action = self._wled_action(entry["command"], role)
+            if action:
+                actions.append(action)
+        return actions
+
+    @staticmethod
+    def _sends_led(device: str, role: str, instance: str) -> bool:
+        """True if a line for `device` is this role instance's to send: its own lines, role-wide ones on the first instance"""
+        device = device.lower()
+        return device == f"{role}#{instance}" or (device in (role, 'all') and instance == "1")
+
+    def output_changes(self, from_step: Optional[int], to_step: int) -> bool:
+        """True if moving between these navigation steps changes this role's display content"""
+        if from_step is None:
+            return True
+        if not (0 <= from_step < len(self.step_outputs) and 0 <= to_step < len(self.step_outputs)):
+            return True
+        return self.step_outputs[from_step] != self.step_outputs[to_step]
+
+    def _compute_step_outputs(self):
+        """Resolve every navigation step once for this role (content as JSON)"""
+        self.step_outputs = []
+        for step in range(len(self.valid_steps)):
+            content, _ = self.resolve(step)
+            self.step_outputs.append(json.dumps(content, sort_keys=True))
+
+    def _resolve_step(self, step: int, role: str, instance: str = "1") -> Dict:
+        """Determine the display content of a step for a role instance"""
         # Convert navigation step to actual step number
         actual_step = self.get_actual_step_number(step)
         
@@ -138,12 +233,13 @@ class TxtScenario:
         if actual_step not in self.steps:
             return self._get_default_display()
 
-        # Find steps for this device/role
-        device_steps = [s for s in self.steps[actual_step] 
-                       if s.device.lower() == self.role.lower() or s.device.lower() == 'all']
+        # Find steps for this device/role, lines for this very instance take precedence
+        instance_steps = [s for s in self.steps[actual_step] if s.device.lower() == f"{role}#{instance}"]
+        device_steps = instance_steps or [s for s in self.steps[actual_step]
+                                          if s.device.lower() == role or s.device.lower() == 'all']
         
         # Special handling for main role - show descriptions if no main image specified
-        if not device_steps and self.role.lower() == 'main':
+        if not device_steps and role == 'main':
             # Look for any step with a description in this step number
             steps_with_desc = [s for s in self.steps[actual_step] if s.desc and s.desc.strip()]
             if steps_with_desc:
@@ -161,7 +257,7 @@ class TxtScenario:
         
         if not device_steps:
             # For non-main roles, show default display
-            if self.role.lower() != 'main':
+            if role != 'main':
                 return self._get_default_display()
             else:
                 # For main role with no content, show nothing
@@ -172,13 +268,9 @@ class TxtScenario:
         # Use the first matching step for this device
         scenario_step = device_steps[0]
 
-        # Handle WLED commands if present
-        if scenario_step.wled:
-            self._handle_wled_command(scenario_step.wled)
-
         # Check if main role will show this step's description
         # If so, don't show description on the original device
-        if self.role.lower() != 'main':
+        if role != 'main':
             main_steps = [s for s in self.steps[actual_step] if s.device.lower() == 'main']
             if not main_steps:
                 # Main has no image for this step, so it will show our description
@@ -200,9 +292,13 @@ class TxtScenario:
 
     def _create_display_content(self, scenario_step: ScenarioStep) -> Dict:
         """Create appropriate display content based on scenario step"""
-        has_image = scenario_step.image and scenario_step.image.upper() != "TEXT"
+        has_image = scenario_step.image and scenario_step.image.upper() not in ("TEXT", "EMPTY")
         has_description = scenario_step.desc and scenario_step.desc.strip()
         
+        # Explicitly blank screen
+        if scenario_step.image and scenario_step.image.upper() == "EMPTY":
+            return {"type": "empty"}
+
         # Handle special text-only display
         if scenario_step.image and scenario_step.image.upper() == "TEXT":
             return {
@@ -240,45 +336,24 @@ class TxtScenario:
         # Fallback to default display
         return self._get_default_display()
 
-    def _handle_wled_command(self, wled_command: str):
-        """Handle WLED commands like 'client>switch' or 'switch>client'"""
-        try:
-            from wled_controller import WledController
-            
-            # Parse direction from command
-            if '>' in wled_command:
-                source, target = wled_command.split('>', 1)
-                source = source.strip().lower()
-                target = target.strip().lower()
-                
-                # Determine if this device should handle the command
-                if source != self.role.lower() and target != self.role.lower():
-                    return  # Not relevant for this device
-
-                # Determine direction
-                reverse = target == self.role.lower()
-
-                # Map device connections to WLED controllers
-                wled_mapping = {
-                    ('client', 'switch'): WledController("192.168.50.21", 1),
-                    ('switch', 'router'): WledController("192.168.50.21", 2),
-                    ('router', 'firewall'): WledController("192.168.50.22", 2),
-                    ('firewall', 'server'): WledController("192.168.50.22", 1),
-                    ('router', 'dns'): WledController("192.168.50.23", 1),
-                    ('dns', 'router'): WledController("192.168.50.23", 1),
-                }
+    def _wled_action(self, wled_command: str, role: str) -> Optional[Dict]:
+        """Turn a WLED command like 'client>switch' into an action for this role, if it concerns it"""
+        if '>' not in wled_command:
+            return None
+        source, target = wled_command.split('>', 1)
+        source = source.strip().lower()
+        target = target.strip().lower()
+
+        # Determine if this device should handle the command
+        if source != role and target != role:
+            return None  # Not relevant for this device
 
-                # Find the appropriate WLED controller
-                connection_key = (source, target)
-                if connection_key in wled_mapping:
-                    controller = wled_mapping[connection_key]
-                    controller.turn_on(reverse)
-                    print(f"WLED: {source} -> {target} (reverse: {reverse})")
-                    
-        except ImportError:
-            print("WLED controller not available")
-        except Exception as e:
-            print(f"Error handling WLED command '{wled_command}': {e}")
+        return {
+            "type": "wled",
+            "source": source,
+            "target": target,
+            "reverse": target == role
+        }
 
     def _get_default_display(self) -> Dict:
         """Return default display content for the device role"""
@@ -0,0 +1,113 @@
+"""
+Startup helpers
+
+Persist the last shown frame so a node can put it on screen right after boot,
+and report time-to-first-frame measured from process start.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from config import LAST_FRAME_DIR
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+_IMPORTED_AT = time.monotonic()
+
+
+def process_age():
+    """Seconds since this process was started (including interpreter startup)"""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Field 22 is the start time in clock ticks after boot; the command
+            # name in field 2 may contain spaces, so split after its ')'
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - _IMPORTED_AT
+
+
+_recorded = set()
+_recorded_lock = threading.Lock()
+
+
+def record_startup_metric(name):
+    """Record `<name>_seconds` once per process, e.g. time_to_first_frame"""
+    with _recorded_lock:
+        if name in _recorded:
+            return
+        _recorded.add(name)
+    age = process_age()
+    METRICS.gauge(f"{name}_seconds").set(round(age, 3))
+    logger.info("%s: %.2fs", name.replace("_", " ").capitalize(), age)
+
+
+class LastFrameStore:
+    """
+    Keeps the most recent frame of a role on disk, written off the hot path: a PNG,
+    or with client-side compositing the layers the page composes (JSON)
+    """
+
+    def __init__(self, role, directory=LAST_FRAME_DIR):
+        self.path = os.path.join(directory, f"last_frame_{role}.png")
+        self.layers_path = os.path.join(directory, f"last_frame_{role}.json")
+        self._pending = None
+        self._condition = threading.Condition()
+        self._writer = None
+
+    def load(self):
+        """Return the stored PNG bytes or None"""
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def load_layers(self):
+        """Return the stored layers frame (see StateManager.get_display_frame) or None"""
+        try:
+            with open(self.layers_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, frame):
+        """Queue a PIL image, PNG bytes or a layers dict for writing, only the newest pending frame is kept"""
+        with self._condition:
+            self._pending = frame
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+            self._condition.notify()
+
+    def _write_loop(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                frame, self._pending = self._pending, None
+            path, stale_path = (self.layers_path, self.path) if isinstance(frame, dict) else (self.path, self.layers_path)
+            try:
+                tmp_path = path + ".tmp"
+                if isinstance(frame, dict):
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(frame, f)
+                elif isinstance(frame, bytes):
+                    with open(tmp_path, "wb") as f:
+                        f.write(frame)
+                else:
+                    # Encoding happens here, off the render path; speed over size
+                    frame.save(tmp_path, format="PNG", compress_level=1)
+                os.replace(tmp_path, path)
+                # A frame of the other compositing mode is older than this one
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            except OSError as e:
+                logger.warning("Last frame could not be saved: %s", e)
@@ -1,157 +1,889 @@
 import redis
-import webview
+import asyncio
+import functools
 import json
-import sys
+import logging
 import os
-from config import REDIS_HOST, REDIS_PORT, REDIS_CHANNEL
-from PIL import Image, ImageDraw, ImageFont
+import random
+import socket
+import uuid
+import threading
+import time
+import queue
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import REDIS_HOST, REDIS_PORT, METRICS_INTERVAL_SEC, COMPOSITING, RIG_ID, HEARTBEAT_INTERVAL_SEC, NODE_ID, RENDER_WORKERS
+from config import REDIS_RECONNECT_MIN_SEC, REDIS_RECONNECT_MAX_SEC, AUTO_PROGRESS_TIMEOUT, TIMELINE_DRIFT_TOLERANCE_SEC
+from config import PROFILE_STEPS
+from metrics import METRICS
+from image_cache import SOURCE_IMAGE_CACHE
+from frame_store import FRAME_STORE
+from config.display_profiles import resolve_resolution
+from action_dispatcher import ActionDispatcher
+from rig import RigNamespace, format_node
+from timeline import build_timeline, timeline_position, step_started_at, TimelineClock
+from quality import QualityGovernor
+from profiler import StepProfiler, step_label, save_profile, log_summary, RESULT_TTL_SEC
+import event_log
 import base64
 from io import BytesIO
 
+logger = logging.getLogger(__name__)
+
+# Layout constants below are tuned for this canvas height and scale with it
+REFERENCE_HEIGHT = 720
+
+# What a node shows, replaced as a whole by the state actor and never modified.
+# `content` is None for the menu state (device image); `version` orders renders.
+DisplaySnapshot = namedtuple("DisplaySnapshot", "version scenario step seq content sent_at")
+
+# Process-wide render workers shared by all StateManager instances
+RENDER_POOL = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+
+
+@functools.lru_cache(maxsize=32)
+def load_font(font_size):
+    """Load the display font, falling back to Arial or the Pillow default font"""
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
+    except:
+        try:
+            return ImageFont.truetype("arial.ttf", font_size)
+        except:
+            return ImageFont.load_default()
+
+
 class StateManager:
-    def __init__(self, role, display_mode="web"):
+    def __init__(self, role, display_mode="web", connect=True, redis_client=None, rig_id=RIG_ID, instance="1"):
         self.role = role
+        self.instance = str(instance)
+        # "router" for the first screen of a role, "router#2" for further ones
+        self.node_name = format_node(role, self.instance)
+        self.host = socket.gethostname()
+        # Unique per process, several nodes may share a role (and a host)
+        self.node_id = NODE_ID or f"{self.host}-{uuid.uuid4().hex[:8]}"
+        # Heartbeat and profile keys: screens of a role on different hosts may share a node name
+        self.node_key = f"{self.node_name}@{self.host}"
+        self.rig = RigNamespace(rig_id)
         self.display_mode = display_mode
         self.state = {
             "scenario": "",
             "step": 0
         }
         self.current_handler = None
+        self.rendered_step = None
+        self.skipped_steps = 0
+        # CPU seconds spent in render jobs of this node
+        self.render_cpu = 0.0
+        self.actions = ActionDispatcher()
+        # Single writer: state, handler and snapshot only change on the actor thread
+        self.snapshot = DisplaySnapshot(0, "", 0, None, None, None)
+        self._commands = queue.Queue()
+        self._delivered_version = -1
+        self._delivery_lock = threading.Lock()
+        self._actor = threading.Thread(target=self._run_actor, daemon=True, name=f"state-{self.node_name}")
+        self._actor.start()
+        # Auto-progress: local clock of the running timeline, main node clock minus ours
+        self.timeline_clock = None
+        self.clock_offset = 0.0
+        self._corrected_at = 0.0
+        self.asset_syncer = None
+        # Legacy scenarios being compiled, and those that failed (path -> mtime of the .py)
+        self._compiling = set()
+        self._compile_failed = {}
+        METRICS.labels["role"] = self.node_name
+        if self.rig.rig_id:
+            METRICS.labels["rig"] = self.rig.rig_id
+        self.redis_client = None
+        self.pubsub = None
+        self.last_sent_at = None
+        # Only nodes that actually show frames persist them (see run_display)
+        self.last_frame = None
+        self.last_frame_key = None
+        self.resolution = resolve_resolution()
+        # Live nodes trade render quality for latency; offline renders (benchmarks) stay at full quality
+        self.quality = QualityGovernor() if connect or redis_client else QualityGovernor(0)
+        # Offline renderers (benchmarks, tools) have no session worth recording
+        self.event_log = event_log.open_event_log(self.node_name, self.rig.rig_id) if connect or redis_client else None
+        # Sampling profiler of the next steps, started by PROFILE_STEPS or a "profile" command
+        self.profiler = None
+        if PROFILE_STEPS and (connect or redis_client):
+            self.start_profile(PROFILE_STEPS)
 
-        try:
-            self.redis_client = redis.Redis(
+        if redis_client is None and connect:
+            # Connects lazily: a broker that is down at startup is retried by the listener
+            redis_client = redis.Redis(
                 host=REDIS_HOST,
                 port=REDIS_PORT,
                 socket_connect_timeout=2
             )
+        # None: offline mode (benchmarks, tools), render only
+        self.redis_client = redis_client
+
+        if redis_client is not None and not isinstance(redis_client, redis.Redis):
+            # In-process LocalBroker (load tests): plain threaded subscription
             self.pubsub = self.redis_client.pubsub()
-            self.pubsub.subscribe(REDIS_CHANNEL)
-        except redis.ConnectionError:
-            print(f"[ERROR] Redis-Verbindung fehlgeschlagen ({REDIS_HOST}:{REDIS_PORT})")
-            sys.exit(1)
+            self.pubsub.subscribe(self.rig.channel)
+
+    def _run_actor(self):
+        while True:
+            command, args, future, queued_at = self._commands.get()
+            METRICS.histogram("state_queue_wait").observe(time.perf_counter() - queued_at)
+            try:
+                result = command(*args)
+            except Exception as e:
+                if future:
+                    future.set_exception(e)
+                else:
+                    logger.exception("State command %s failed: %s", getattr(command, "__name__", command), e)
+                continue
+            if future:
+                future.set_result(result)
+
+    def submit(self, command, *args):
+        """Queue a state command for the actor thread without waiting for it"""
+        self._commands.put((command, args, None, time.perf_counter()))
+
+    def call(self, command, *args):
+        """Run a state command on the actor thread and return its result"""
+        if threading.current_thread() is self._actor:
+            return command(*args)
+        future = Future()
+        self._commands.put((command, args, future, time.perf_counter()))
+        return future.result()
+
+    def get_state(self):
+        """Copy of the current state, consistent with itself"""
+        return self.call(lambda: json.loads(json.dumps(self.state)))
 
     def update_state(self, new_state):
+        self.call(self._update_state, dict(new_state))
+
+    def advance(self, delta):
+        """Move the step by delta (not below 0) in one command, return the new step"""
+        return self.call(self._advance, delta)
+
+    def _advance(self, delta):
+        step = max(0, self.state["step"] + delta)
+        self._update_state({"step": step})
+        return step
+
+    def _update_state(self, new_state):
+        if "wled_state" not in new_state:
+            # A folded LED state only belongs to the seek that published it
+            self.state.pop("wled_state", None)
+        if "timeline" not in new_state:
+            # Any other change (manual step, scenario switch) ends playback
+            self.state.pop("timeline", None)
         self.state.update(new_state)
+        # Every published state is a new sequence, its actions run once per node
+        self.state["seq"] = self.state.get("seq", 0) + 1
+        self._sync_timeline_clock()
         try:
             self.broadcast_state()
-            self.handle_state_change()
         except redis.ConnectionError:
-            print("[WARN] Redis: Status konnte nicht gesendet werden")
+            # The resync after reconnecting publishes it; this node shows it right away
+            logger.warning("Redis: Status konnte nicht gesendet werden")
+        self.handle_state_change()
+
+    def seek(self, step):
+        """
+        Jump straight to a step with a single state change. The LED state at that step
+        is folded from the scenario start and published along, so every node restores
+        its strips without replaying the steps in between.
+        """
+        return self.call(self._seek, step)
+
+    def _seek(self, step):
+        step = max(0, min(int(step), self.get_max_steps() - 1))
+        new_state = {"step": step}
+        wled_state = getattr(self.current_handler, "wled_state", None)
+        if wled_state is not None:
+            new_state["wled_state"] = wled_state(step)
+        if "timeline" in self.state:
+            # Keep playing from the new step
+            new_state["timeline"] = build_timeline(step, self.state["timeline"]["durations"])
+        self._update_state(new_state)
+        return step
+
+    def play(self):
+        """
+        Auto-progress from the current step. The timeline (start time and seconds per
+        step) is published once, every node then advances on its own clock.
+        """
+        return self.call(self._play)
+
+    def _play(self):
+        if not self.current_handler:
+            return False
+        step_durations = getattr(self.current_handler, "step_durations", None)
+        if step_durations is not None:
+            durations = step_durations()
+        else:
+            durations = [AUTO_PROGRESS_TIMEOUT / 1000] * self.get_max_steps()
+        self._update_state({"timeline": build_timeline(self.state["step"], durations)})
+        return True
+
+    def pause(self):
+        """Stop auto-progress on the step shown right now, return that step"""
+        return self.call(self._pause)
+
+    def _pause(self):
+        if "timeline" in self.state:
+            self._update_state({})
+        return self.state["step"]
+
+    def _sync_timeline_clock(self):
+        """Start, keep or stop the local clock for the timeline in the state (actor thread)"""
+        timeline = self.state.get("timeline")
+        if self.timeline_clock and self.timeline_clock.timeline is not timeline:
+            self.timeline_clock.stop()
+            self.timeline_clock = None
+        if timeline and not self.timeline_clock:
+            self.timeline_clock = TimelineClock(timeline, self._on_timeline_step, self.clock_offset).start()
+
+    def _on_timeline_step(self, clock, step):
+        self.submit(self._timeline_step, clock, step)
+
+    def _timeline_step(self, clock, step):
+        """Next step of a running timeline, resolved from the own step table without any message"""
+        if clock is not self.timeline_clock or step == self.state.get("step"):
+            return
+        self.state["step"] = step
+        # A folded LED state belongs to the seek step only, this step runs its own LED commands
+        self.state.pop("wled_state", None)
+        # Frames of this step are measured from when it was due, not from the play message
+        self.last_sent_at = step_started_at(clock.timeline, step)
+        self.log_event(event_log.TIMELINE_STEP, {
+            "scenario": self.state.get("scenario"),
+            "step": step,
+            "seq": self.state.get("seq"),
+            "due_at": self.last_sent_at
+        })
+        self.handle_state_change()
+
+    def _prefetch(self, step):
+        """Render a coming timeline step into the frame store before it is due"""
+        if step >= self.get_max_steps() or not self._shows_stored_frames():
+            return
+        output_changes = getattr(self.current_handler, "output_changes", None)
+        if output_changes is not None and not output_changes(step - 1, step):
+            return
+        content, _ = self.current_handler.resolve(step)
+        METRICS.counter("prefetched_frames").inc()
+        RENDER_POOL.submit(self.render_png, content)
+
+    def _prerender_scenario(self):
+        """Render every distinct frame of the loaded scenario into the frame store (actor thread)"""
+        # Step tables only: legacy step methods drive hardware when they are resolved
+        step_outputs = getattr(self.current_handler, "step_outputs", None)
+        if not step_outputs or not self._shows_stored_frames():
+            return
+        RENDER_POOL.submit(self._prerender_job, self.current_handler, [self.quality.scaled(self.resolution)])
+
+    def _prerender_job(self, handler, sizes):
+        # One job for the whole scenario keeps the other workers free for live frames
+        contents = [json.loads(output) for output in dict.fromkeys(handler.step_outputs)]
+        with METRICS.timer("prerender_scenario"):
+            for content in contents:
+                if handler is not self.current_handler:
+                    # Another scenario was loaded meanwhile
+                    return
+                self.render_variants(content, sizes)
+        METRICS.counter("prerendered_frames").inc(len(contents) * len(sizes))
+
+    def _check_timeline_drift(self):
+        """Republish the timeline if a node's heartbeat step does not match it (main node, actor thread)"""
+        timeline = self.state.get("timeline")
+        if not timeline or not self.redis_client:
+            return
+        try:
+            for key in self.redis_client.scan_iter(match=self.rig.heartbeat_key("*")):
+                data = self.redis_client.get(key)
+                heartbeat = json.loads(data) if data else None
+                if not heartbeat or heartbeat.get("node") == self.node_id:
+                    continue
+                if heartbeat.get("scenario") != self.state["scenario"]:
+                    continue
+                # Heartbeat time on the main node's clock
+                at = heartbeat["at"] + heartbeat.get("clock_offset", 0.0)
+                if at < max(timeline["started_at"], self._corrected_at) + TIMELINE_DRIFT_TOLERANCE_SEC:
+                    # Beat from before this timeline or the last correction
+                    continue
+                earliest, _ = timeline_position(timeline, at - TIMELINE_DRIFT_TOLERANCE_SEC)
+                latest, _ = timeline_position(timeline, at + TIMELINE_DRIFT_TOLERANCE_SEC)
+                if not earliest <= heartbeat.get("step", -1) <= latest:
+                    METRICS.counter("timeline_corrections").inc()
+                    logger.info("%s weicht von der Zeitleiste ab, sende Korrektur", heartbeat.get("address"))
+                    self._corrected_at = time.time()
+                    self.broadcast_state()
+                    return
+        except redis.ConnectionError:
+            pass
 
     def broadcast_state(self):
+        if not self.redis_client:
+            return
+        self.last_sent_at = time.time()
         message = {
+            "rig": self.rig.rig_id,
             "source_role": self.role,
+            "source_instance": self.instance,
+            "source_node": self.node_id,
             "state": self.state,
-            "command": "update_state" if self.state["scenario"] else "show_role_image"
+            "command": "update_state" if self.state["scenario"] else "show_role_image",
+            "sent_at": self.last_sent_at
         }
-        self.redis_client.publish(REDIS_CHANNEL, json.dumps(message))
+        data = json.dumps(message)
+        self.log_event(event_log.STATE_SENT, message)
+        self.redis_client.publish(self.rig.channel, data)
+        # Snapshot of the rig's current state for nodes that (re)connect later
+        self.redis_client.set(self.rig.key("state"), data)
 
-    def listen_for_updates(self):
+    def enable_asset_sync(self):
+        """Fetch assets announced by the main node, starting with the last published manifest"""
+        from asset_sync import AssetSyncer, MANIFEST_KEY
+        self.asset_syncer = AssetSyncer()
+        if self.redis_client:
+            self.asset_syncer.sync_from_snapshot(self.redis_client, self.rig.key(MANIFEST_KEY))
+
+    def start_heartbeat(self, interval=HEARTBEAT_INTERVAL_SEC):
+        """Refresh this node's heartbeat key in its rig; it expires after three missed beats"""
+        if not interval or not self.redis_client:
+            return
+
+        def beat():
+            key = self.rig.heartbeat_key(self.node_key)
+            while True:
+                snapshot = self.snapshot
+                heartbeat = {
+                    "address": self.rig.address(self.node_name),
+                    "host": self.host,
+                    "node": self.node_id,
+                    "at": time.time(),
+                    "scenario": snapshot.scenario,
+                    "step": snapshot.step,
+                    "clock_offset": self.clock_offset,
+                    "quality": self.quality.settings["name"]
+                }
+                try:
+                    self.redis_client.set(key, json.dumps(heartbeat), ex=interval * 3)
+                except redis.ConnectionError:
+                    pass
+                if self.is_controller:
+                    self.submit(self._check_timeline_drift)
+                time.sleep(interval)
+
+        threading.Thread(target=beat, daemon=True).start()
+
+    def start_profile(self, steps):
+        """Sample handle_state_change and the render path of the next `steps` steps"""
+        if self.profiler is not None:
+            logger.warning("Profiler already running, %d steps left", self.profiler.remaining)
+            return False
+        logger.info("Profiling the next %d steps", steps)
+        self.profiler = StepProfiler(steps, on_finish=self._profile_finished).start()
+        return True
+
+    def request_profile(self, steps, nodes=None):
+        """Profile the next steps on the given nodes ("router", "router#2") or on all nodes of the rig"""
+        if not nodes or self.node_name in nodes:
+            self.start_profile(steps)
+        if not self.redis_client:
+            return
+        message = {
+            "rig": self.rig.rig_id,
+            "source_role": self.role,
+            "source_instance": self.instance,
+            "source_node": self.node_id,
+            "command": "profile",
+            "steps": steps,
+            "nodes": nodes or []
+        }
         try:
+            self.redis_client.publish(self.rig.channel, json.dumps(message))
+        except redis.ConnectionError:
+            logger.warning("Redis: Profil-Anfrage konnte nicht gesendet werden")
+
+    def _profile_finished(self, profiler):
+        # Profiler thread: summary to the log, collapsed stacks to disk and Redis
+        self.profiler = None
+        result = profiler.result()
+        address = self.rig.address(self.node_name)
+        log_summary(address, result["steps"])
+        path = save_profile(result, address)
+        if path:
+            logger.info("Profile written to %s", path)
+        if self.redis_client:
+            result.update(node=self.node_id, address=address, host=self.host)
+            try:
+                self.redis_client.set(self.rig.key(f"profile:{self.node_key}"), json.dumps(result), ex=RESULT_TTL_SEC)
+            except redis.ConnectionError:
+                logger.warning("Redis: Profil konnte nicht gespeichert werden")
+
+    def collect_profiles(self):
+        """Last profile result of every node of this rig"""
+        profiles = []
+        if not self.redis_client:
+            return profiles
+        try:
+            for key in self.redis_client.scan_iter(match=self.rig.key("profile:*")):
+                data = self.redis_client.get(key)
+                if data:
+                    profiles.append(json.loads(data))
+        except redis.ConnectionError:
+            logger.warning("Redis: Profile konnten nicht gelesen werden")
+        return sorted(profiles, key=lambda profile: (profile.get("address", ""), profile.get("host", "")))
+
+    def log_event(self, event_type, payload):
+        if self.event_log:
+            self.event_log.record(event_type, payload)
+
+    def start_metrics_reporting(self, interval=METRICS_INTERVAL_SEC):
+        """Periodically publish a JSON metrics summary on the Redis channel"""
+        if not interval:
+            return
+
+        def report():
+            while True:
+                time.sleep(interval)
+                message = {
+                    "rig": self.rig.rig_id,
+                    "source_role": self.role,
+                    "source_instance": self.instance,
+                    "source_node": self.node_id,
+                    "command": "metrics",
+                    "metrics": METRICS.summary()
+                }
+                try:
+                    self.redis_client.publish(self.rig.channel, json.dumps(message))
+                except redis.ConnectionError:
+                    pass
+
+        threading.Thread(target=report, daemon=True).start()
+
+    def listen_for_updates(self):
+        """Handle messages of the rig channel until the process ends, reconnecting as needed"""
+        if self.pubsub is not None:
             for message in self.pubsub.listen():
-                if message["type"] != "message":
-                    continue
-                data = json.loads(message["data"])
-                if data["source_role"] == self.role:
-                    continue
-                if data.get("command") == "show_role_image":
-                    self.state = {"scenario": "", "step": 0}
-                    self.current_handler = None
-                    # Clear current display content so device image is shown
-                    if hasattr(self, 'current_display_content'):
-                        delattr(self, 'current_display_content')
-                    self.trigger_webview_update()
-                else:
-                    self.state = data["state"]
-                    self.handle_state_change()
+                if message["type"] == "message":
+                    self.handle_message(message["data"])
+        elif self.redis_client is not None:
+            asyncio.run(self._listen_async())
+
+    async def _listen_async(self):
+        import redis.asyncio as aioredis
+
+        connection_kwargs = self.redis_client.connection_pool.connection_kwargs
+        backoff = REDIS_RECONNECT_MIN_SEC
+        lost_at = None
+        while True:
+            client = aioredis.Redis(
+                host=connection_kwargs.get("host", REDIS_HOST),
+                port=connection_kwargs.get("port", REDIS_PORT),
+                db=connection_kwargs.get("db", 0),
+                password=connection_kwargs.get("password"),
+                socket_connect_timeout=2,
+                socket_keepalive=True,
+                health_check_interval=REDIS_RECONNECT_MAX_SEC
+            )
+            pubsub = client.pubsub()
+            try:
+                with METRICS.timer("redis_reconnect" if lost_at else "redis_connect"):
+                    await pubsub.subscribe(self.rig.channel)
+                    await self._resync(client)
+                METRICS.gauge("redis_connected").set(1)
+                if lost_at is not None:
+                    outage = time.monotonic() - lost_at
+                    METRICS.histogram("redis_outage").observe(outage)
+                    METRICS.gauge("redis_last_outage_seconds").set(round(outage, 3))
+                    METRICS.counter("redis_reconnects").inc()
+                    logger.info("Redis wieder verbunden nach %.1fs", outage)
+                    lost_at = None
+                backoff = REDIS_RECONNECT_MIN_SEC
+                while True:
+                    # Timed reads, so health checks also notice a silently dropped connection
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self.handle_message(message["data"])
+            except (redis.ConnectionError, redis.TimeoutError, OSError) as e:
+                METRICS.gauge("redis_connected").set(0)
+                if lost_at is None:
+                    lost_at = time.monotonic()
+                    logger.warning("Redis-Verbindung verloren (%s), neuer Versuch ...", e)
+            finally:
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except (redis.RedisError, OSError):
+                    pass
+            # Jitter keeps a whole fleet from reconnecting in lockstep
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, REDIS_RECONNECT_MAX_SEC)
+
+    async def _resync(self, client):
+        """
+        Catch up after (re)subscribing. Display nodes apply the rig's state snapshot:
+        an unchanged step keeps its frame on screen, scenario and caches stay loaded.
+        The controller re-applies and republishes its state, which may have changed
+        while offline.
+        """
+        if self.is_controller:
+            self.submit(self._rebroadcast)
+            return
+        data = await client.get(self.rig.key("state"))
+        if data:
+            METRICS.counter("redis_resyncs").inc()
+            self.handle_message(data, resync=True)
+
+    def _rebroadcast(self):
+        # Unchanged steps keep their frame, actions of a sequence run once
+        self.handle_state_change()
+        try:
+            self.broadcast_state()
         except redis.ConnectionError:
-            print("[ERROR] Redis-Verbindung verloren")
-            sys.exit(1)
+            logger.warning("Redis: Status konnte nicht gesendet werden")
+
+    def handle_message(self, raw, resync=False):
+        """Decode and filter a channel message (listener thread), state changes go to the actor"""
+        received_at = time.time()
+        try:
+            with METRICS.timer("json_decode"):
+                data = json.loads(raw)
+        except ValueError:
+            METRICS.counter("dropped_messages").inc()
+            return
+        if data.get("rig", "") != self.rig.rig_id:
+            # Another rig on a shared channel name, never ours to handle
+            METRICS.counter("foreign_rig_messages").inc()
+            return
+        if "source_node" in data:
+            if data["source_node"] == self.node_id:
+                return
+        elif data.get("source_role") == self.role:
+            # Older senders without a node id
+            return
+        if data.get("command") == "metrics":
+            return
+        if data.get("command") == "asset_manifest":
+            if self.asset_syncer:
+                self.asset_syncer.sync_in_background(data["manifest"])
+            return
+        if data.get("command") == "profile":
+            if not data.get("nodes") or self.node_name in data["nodes"]:
+                self.start_profile(int(data.get("steps", 10)))
+            return
+        self.log_event(event_log.STATE_RECEIVED, data)
+        if data.get("sent_at") and not resync:
+            METRICS.histogram("redis_receive").observe(max(0.0, received_at - data["sent_at"]))
+        # The listener only decodes, state changes and resolving run on the actor
+        self.submit(self.apply_message, data, None if resync else received_at)
+
+    def apply_message(self, data, received_at=None):
+        """Apply a state message of another node (actor thread)"""
+        self.last_sent_at = data.get("sent_at")
+        if data.get("command") == "show_role_image":
+            self.state = {"scenario": "", "step": 0}
+            self._sync_timeline_clock()
+            self.current_handler = None
+            self.rendered_step = None
+            # Empty snapshot content: the device image is shown
+            self.publish_snapshot(None)
+        elif "state" in data:
+            self.state = data["state"]
+            timeline = self.state.get("timeline")
+            if timeline:
+                if received_at and data.get("sent_at"):
+                    # Sync messages double as clock sync, LAN latency is far below a step
+                    self.clock_offset = data["sent_at"] - received_at
+                self.state["step"], _ = timeline_position(timeline, time.time() + self.clock_offset)
+            self._sync_timeline_clock()
+            self.handle_state_change()
+        else:
+            METRICS.counter("dropped_messages").inc()
+
+    def publish_snapshot(self, content):
+        """Replace the snapshot readers see and get it on screen (actor thread)"""
+        self.snapshot = DisplaySnapshot(
+            self.snapshot.version + 1,
+            self.state.get("scenario", ""),
+            self.state.get("step", 0),
+            self.state.get("seq"),
+            dict(content) if isinstance(content, dict) else content,
+            self.last_sent_at
+        )
+        self.trigger_webview_update()
 
     def trigger_webview_update(self):
-        if hasattr(self, 'webview_window'):
+        """Render the current snapshot on a worker and hand it to the display"""
+        if not hasattr(self, 'display_sink') and not hasattr(self, 'webview_window'):
+            return
+        RENDER_POOL.submit(self._render_job, self.snapshot)
+
+    def _render_job(self, snapshot):
+        profiler = self.profiler
+        if profiler is None:
+            return self._render_and_deliver(snapshot)
+        with profiler.section(step_label(snapshot.scenario, snapshot.step)):
+            return self._render_and_deliver(snapshot)
+
+    def _render_and_deliver(self, snapshot):
+        if snapshot.version < self.snapshot.version:
+            # A newer state arrived while this render was queued
+            METRICS.counter("superseded_renders").inc()
+            return
+        cpu_start = time.thread_time()
+        try:
+            if self._shows_stored_frames():
+                # Fill the frame store outside the delivery lock, the display then gets a hit
+                self.render_png(self.get_display_content(snapshot))
+            with self._delivery_lock:
+                if snapshot.version < max(self._delivered_version, self.snapshot.version):
+                    METRICS.counter("superseded_renders").inc()
+                    return
+                self._delivered_version = snapshot.version
+                self._deliver()
+        except Exception as e:
+            logger.error("Render of step %s failed: %s", snapshot.step, e)
+            return
+        finally:
+            self.render_cpu += time.thread_time() - cpu_start
+        self.log_event(event_log.FRAME_ACK, {
+            "scenario": snapshot.scenario,
+            "step": snapshot.step,
+            "seq": snapshot.seq,
+            "sent_at": snapshot.sent_at
+        })
+
+    def _shows_stored_frames(self):
+        """True if the display shows encoded frames from the frame store, not layers or its own renders"""
+        if hasattr(self, 'display_sink'):
+            return self.display_sink.uses_frame_store
+        return hasattr(self, 'webview_window') and COMPOSITING != "client"
+
+    def _deliver(self):
+        if hasattr(self, 'display_sink'):
+            self.display_sink.update()
+        else:
             try:
-                self.webview_window.evaluate_js('updateImage()')
+                with METRICS.timer("bridge_delivery"):
+                    self.webview_window.evaluate_js('updateImage()')
             except Exception as e:
-                print(f"[WARN] JS-Update fehlgeschlagen: {e}")
+                logger.warning("JS-Update fehlgeschlagen: %s", e)
 
 
     def handle_state_change(self):
+        profiler = self.profiler
+        if profiler is None:
+            return self._apply_state_change()
+        with profiler.step(step_label(self.state["scenario"], self.state["step"])):
+            return self._apply_state_change()
+
+    def _apply_state_change(self):
         scenario = self.state["scenario"]
         step = self.state["step"]
 
         if scenario:  # Scenario is running
+            loaded = False
             if not self.current_handler or scenario != self.state.get("last_scenario"):
-                self.current_handler = self.load_scenario(scenario)
+                started = time.perf_counter()
+                with METRICS.timer("load_scenario"):
+                    self.current_handler = self.load_scenario(scenario)
                 self.state["last_scenario"] = scenario
+                self.rendered_step = None
+                loaded = True
+                self.log_event(event_log.PRELOAD, {
+                    "scenario": scenario,
+                    "loaded": self.current_handler is not None,
+                    "duration_sec": round(time.perf_counter() - started, 6)
+                })
+            if not self.current_handler:
+                return
 
-            result = self.current_handler.execute_step(step)
-            
-            # Store the result for web display
-            self.current_display_content = result
+            with METRICS.timer("resolve_step"):
+                result, actions = self.current_handler.resolve(step)
+                wled_state = self.state.get("wled_state")
+                if wled_state is not None and hasattr(self.current_handler, "led_actions"):
+                    # Seek: restore the whole LED state instead of this step's command only
+                    actions = self.current_handler.led_actions(wled_state)
+            sequence = self.state.get("seq")
+            if "timeline" in self.state:
+                # Local timeline steps share the seq of the message that started playback
+                sequence = (sequence, step)
+            if self.actions.dispatch(actions, sequence):
+                for action in actions:
+                    if action.get("type") == "wled":
+                        self.log_event(event_log.WLED, dict(action, seq=self.state.get("seq")))
+
+            if self._step_unchanged(step):
+                # Same content for this role: nothing to render or update
+                METRICS.counter("skipped_steps").inc()
+                self.skipped_steps += 1
+                self.rendered_step = step
+                # Same frame, only the step moves on (heartbeats, status)
+                self.snapshot = self.snapshot._replace(step=step, seq=self.state.get("seq"))
+            else:
+                self.rendered_step = step
+                self.publish_snapshot(result)
+            if loaded:
+                # Queued after the frame of this step, so it never waits for the warm-up
+                self._prerender_scenario()
+            if "timeline" in self.state:
+                self._prefetch(step + 1)
         else:
-            # No scenario running - clear display content so device image is shown
-            if hasattr(self, 'current_display_content'):
-                delattr(self, 'current_display_content')
+            # No scenario running - empty snapshot content so device image is shown
             self.current_handler = None
+            self.rendered_step = None
+            self.publish_snapshot(None)
 
-        self.trigger_webview_update()
+    def _step_unchanged(self, step):
+        """True if the scenario says this role's output at `step` equals the one on screen"""
+        output_changes = getattr(self.current_handler, "output_changes", None)
+        if output_changes is None or self.rendered_step is None:
+            return False
+        return not output_changes(self.rendered_step, step)
 
 
     def load_scenario(self, scenario_name):
         """Load scenario from text file or fall back to Python module"""
         txt_file_path = f"scenarios/{scenario_name}.txt"
+        python_file_path = f"scenarios/{scenario_name}.py"
+        if not os.path.exists(txt_file_path) and os.path.exists(python_file_path):
+            # Legacy scenario: use its compiled step table (cached until the .py changes)
+            from scenarios.scenario_converter import compiled_legacy_scenario
+            compiled = compiled_legacy_scenario(python_file_path)
+            if compiled:
+                txt_file_path = compiled
+            elif self._compile_failed.get(python_file_path) != os.path.getmtime(python_file_path):
+                # Compiling runs the scenario in a subprocess, never on the actor
+                self._compile_in_background(scenario_name, python_file_path)
+                return None
         if os.path.exists(txt_file_path):
             from scenarios.scenario_parser import TxtScenario
-            return TxtScenario(self.role, txt_file_path)
+            return TxtScenario(self.role, txt_file_path, self.instance)
         else:
             # Fall back to Python module for legacy scenarios
             try:
                 module = __import__(f"scenarios.{scenario_name}", fromlist=["Scenario"])
                 return module.Scenario(self.role)
             except ImportError:
-                print(f"Error: Could not load scenario '{scenario_name}'. Please ensure the scenario file exists as either {scenario_name}.txt or {scenario_name}.py")
+                logger.error("Could not load scenario '%s'. Please ensure the scenario file exists as either %s.txt or %s.py",
+                             scenario_name, scenario_name, scenario_name)
                 return None
 
+    def _compile_in_background(self, scenario_name, python_file_path):
+        """Compile a legacy scenario on its own thread, then load it if it is still running (actor thread)"""
+        if python_file_path in self._compiling:
+            return
+        self._compiling.add(python_file_path)
+        logger.info("Compiling legacy scenario '%s'", scenario_name)
+
+        def compile_scenario():
+            from scenarios.scenario_converter import compile_legacy_scenario
+            mtime = os.path.getmtime(python_file_path)
+            with METRICS.timer("compile_scenario"):
+                compiled = compile_legacy_scenario(python_file_path)
+            self.submit(self._scenario_compiled, scenario_name, python_file_path, None if compiled else mtime)
+
+        threading.Thread(target=compile_scenario, daemon=True, name=f"compile-{scenario_name}").start()
+
+    def _scenario_compiled(self, scenario_name, python_file_path, failed_mtime):
+        self._compiling.discard(python_file_path)
+        if failed_mtime is not None:
+            # Run the Python module directly until the file changes
+            self._compile_failed[python_file_path] = failed_mtime
+        if self.state.get("scenario") == scenario_name and self.current_handler is None:
+            self.handle_state_change()
+
     def scale_image(self, image, width, height):
+        from PIL import Image
         width_ratio = width / image.width
         height_ratio = height / image.height
         scale_ratio = min(width_ratio, height_ratio)
         new_size = (int(image.width * scale_ratio), int(image.height * scale_ratio))
-        return image.resize(new_size, Image.Resampling.LANCZOS)
+        with METRICS.timer("resize"):
+            return image.resize(new_size, self.quality.resample)
+
+    def load_scaled_image(self, image_path, width, height):
+        """Decoded source image scaled to fit (width, height), shared via the image cache"""
+        return SOURCE_IMAGE_CACHE.get(image_path, width, height, self.quality.resample)
+
+    def encode_image_png(self, img):
+        """Encode a PIL image as PNG bytes"""
+        buffered = BytesIO()
+        with METRICS.timer("encode"):
+            img.save(buffered, format="PNG", compress_level=self.quality.compress_level)
+        return buffered.getvalue()
+
+    def encode_image_base64(self, img):
+        """Encode a PIL image as PNG data URI"""
+        png = self.encode_image_png(img)
+        with METRICS.timer("base64"):
+            return f"data:image/png;base64,{base64.b64encode(png).decode('utf-8')}"
+
+    @property
+    def is_controller(self):
+        """The first main instance runs the selector and publishes; further ones only display"""
+        return self.role == "main" and self.instance == "1"
 
     def run_display(self):
-        if self.role == "main":
+        if self.is_controller:
             return
 
+        from startup import LastFrameStore
+        self.last_frame = LastFrameStore(self.node_name)
+
         if self.display_mode == "web":
             try:
                 from ui.web_ui.web_display import WebDeviceDisplay
                 WebDeviceDisplay(self).run()
             except Exception as e:
-                print(f"[ERROR] Webview Display: {e}")
+                logger.error("Webview Display: %s", e)
+        elif self.display_mode in ("file", "framebuffer"):
+            from ui.headless_display import create_headless_display
+            create_headless_display(self, self.display_mode).run()
+        else:
+            logger.error("Unknown display mode '%s'", self.display_mode)
 
     def set_webview(self, webview_window):
         self.webview_window = webview_window
 
-    def get_display_image_base64(self):
-        if hasattr(self, 'current_display_content') and self.current_display_content:
-            content = self.current_display_content
-        else:
-            if self.state["scenario"] and self.current_handler:
-                content = self.current_handler.execute_step(self.state["step"])
-            else:
-                # Show device image when no scenario is running (menu state)
-                content = {"type": "image", "content": f"images/devices/{self.role}.png"}
+    def set_resolution(self, width, height):
+        """Render for the native size of this node's display from now on"""
+        self.resolution = (int(width), int(height))
+        self.last_frame_key = None
+        logger.info("Rendering at %dx%d", *self.resolution)
+        # Frames rendered for the previous size never hit again
+        self.submit(self._prerender_scenario)
+
+    def set_display_sink(self, display_sink):
+        """Register a headless display that is updated instead of a webview"""
+        self.display_sink = display_sink
+
+    def get_display_content(self, snapshot=None):
+        """Return the content dict (or legacy string) of a snapshot, default the current one"""
+        snapshot = snapshot or self.snapshot
+        if snapshot.content:
+            return snapshot.content
+        # Show device image when no scenario is running (menu state)
+        return {"type": "image", "content": f"images/devices/{self.role}.png"}
+
+    def render_display_image(self, content=None, size=None):
+        """Render the current (or given) content into a PIL image, None on failure"""
+        if content is None:
+            content = self.get_display_content()
+        # A reduced quality level renders smaller, the display scales the frame up
+        size = size or self.quality.scaled(self.resolution)
 
         # Handle different content types
         if isinstance(content, dict):
             if content["type"] == "empty":
-                return self.create_empty_image_base64()
+                return self.create_empty_image(size)
             if content["type"] == "text":
-                return self.create_text_image_base64(content["content"])
+                return self.create_text_image(content["content"], size)
             elif content["type"] == "image_with_text":
-                return self.create_image_with_text_base64(content["image"], content["text"])
+                return self.create_image_with_text(content["image"], content["text"], size)
             elif content["type"] == "image":
                 image_path = content["content"]
             else:
@@ -160,29 +892,137 @@ class StateManager:
             # Backward compatibility for old string returns
             if content and content.startswith("TEXT:"):
                 text_content = content[5:]  # Remove "TEXT:" prefix
-                return self.create_text_image_base64(text_content)
+                return self.create_text_image(text_content, size)
             image_path = content or f"images/devices/{self.role}.png"
 
         try:
-            img = Image.open(image_path)
-            img = self.scale_image(img, 1280, 720)
-            buffered = BytesIO()
-            img.save(buffered, format="PNG")
-            return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
+            return self.load_scaled_image(image_path, *size)
         except Exception as e:
-            print(f"[ERROR] Image to Base64 failed: {e}")
+            logger.error("Image to Base64 failed: %s", e)
+            return None
+
+    def frame_key(self, content, size=None):
+        """Frame store key: role, resolution, quality level, content and the mtime of the source image"""
+        image_path = None
+        if isinstance(content, dict):
+            image_path = content.get("image") or (content.get("content") if content.get("type") == "image" else None)
+        elif content and not content.startswith("TEXT:"):
+            image_path = content
+        try:
+            mtime = os.stat(image_path).st_mtime_ns if image_path else 0
+        except OSError:
+            mtime = -1
+        width, height = size or self.quality.scaled(self.resolution)
+        return f"{self.role}|{width}x{height}|q{self.quality.level}|{mtime}|{json.dumps(content, sort_keys=True)}"
+
+    def render_png(self, content, size=None):
+        """Encoded PNG for content at the given size, served from the frame store when possible"""
+        key = self.frame_key(content, size)
+        png = FRAME_STORE.get(key)
+        if png is None:
+            started = time.perf_counter()
+            img = self.render_display_image(content, size)
+            if img is None:
+                return None, key
+            png = self.encode_image_png(img)
+            self.quality.observe(time.perf_counter() - started)
+            FRAME_STORE.put(key, png)
+        return png, key
+
+    def render_variants(self, content, sizes):
+        """Pre-render content for several resolutions into the frame store, {size: rendered}"""
+        return {tuple(size): self.render_png(content, tuple(size))[0] is not None for size in sizes}
+
+    def get_display_png(self):
+        """Encoded PNG of the current frame, None on failure"""
+        png, key = self.render_png(self.get_display_content())
+        if png is None:
+            return None
+        if key != self.last_frame_key:
+            self.last_frame_key = key
+            self.remember_frame(png)
+        return png
+
+    def get_display_frame(self):
+        """
+        Structured frame for the web displays. With client-side compositing the
+        page gets an image reference plus caption and layout and draws the text
+        itself, otherwise a rendered bitmap.
+        """
+        if COMPOSITING != "client":
+            return {"kind": "bitmap", "src": self.get_display_image_base64()}
+
+        content = self.get_display_content()
+        if not isinstance(content, dict):
+            # Legacy string returns
+            if content and content.startswith("TEXT:"):
+                content = {"type": "text", "content": content[5:]}
+            else:
+                content = {"type": "image", "content": content or f"images/devices/{self.role}.png"}
+
+        frame = {"kind": "layers", "layout": content["type"], "image": None, "text": None}
+        if content["type"] == "text":
+            frame["text"] = content["content"]
+        elif content["type"] == "image_with_text":
+            frame["image"] = self.image_url(content["image"])
+            frame["text"] = content["text"]
+        elif content["type"] == "image":
+            frame["image"] = self.image_url(content["content"])
+
+        # The page composites, so the frame kept for the next boot is the layers, not a bitmap
+        key = ("layers", json.dumps(frame, sort_keys=True))
+        if key != self.last_frame_key:
+            self.last_frame_key = key
+            self.remember_frame(frame)
+        return frame
+
+    @staticmethod
+    def image_url(image_path):
+        """URL of a repository image relative to the pages in ui/web_ui, cacheable by the browser"""
+        from urllib.parse import quote
+        return "../../" + quote(image_path.replace(os.sep, "/"))
+
+    def get_display_image_base64(self):
+        png = self.get_display_png()
+        if png is None:
             return ""
+        with METRICS.timer("base64"):
+            return f"data:image/png;base64,{base64.b64encode(png).decode('utf-8')}"
+
+    def remember_frame(self, frame):
+        """Persist the frame (PIL image, PNG bytes or layers dict) so it can be shown right after the next start"""
+        if self.last_frame:
+            self.last_frame.save(frame)
+
+    def get_startup_frame(self):
+        """Last frame shown before the previous shutdown, read from disk, in get_display_frame form"""
+        if not self.last_frame:
+            return None
+        layers = self.last_frame.load_layers()
+        if layers:
+            return layers
+        png = self.last_frame.load()
+        if not png:
+            return None
+        return {"kind": "bitmap", "src": f"data:image/png;base64,{base64.b64encode(png).decode('utf-8')}"}
 
     def get_max_steps(self):
         if self.current_handler:
             return getattr(self.current_handler, "maximum_steps", 1)
         return 1
 
-    def create_text_image_base64(self, text_content):
+    def create_text_image_base64(self, text_content, size=None):
         """Create a base64 image from text content"""
+        img = self.create_text_image(text_content, size)
+        return self.encode_image_base64(img) if img is not None else ""
+
+    def create_text_image(self, text_content, size=None):
+        """Create an image from text content"""
+        from PIL import Image, ImageDraw
         try:
             # Create a white image
-            img_width, img_height = 1280, 720
+            img_width, img_height = size or self.resolution
+            scale = img_height / REFERENCE_HEIGHT
             img = Image.new('RGB', (img_width, img_height), color='white')
             draw = ImageDraw.Draw(img)
             
@@ -193,23 +1033,20 @@ class StateManager:
             original_lines = text_content.split('\n')
             
             # Try different font sizes to fit content
-            font_sizes = [48, 36, 28, 24, 20, 16]
+            font_sizes = [round(s * scale) for s in (48, 36, 28, 24, 20, 16)]
+            line_spacing = round(10 * scale)
+            margin = round(80 * scale)
             font = None
             wrapped_lines = []
+            layout_started = time.perf_counter()
             
             for font_size in font_sizes:
                 # Try to use a nice font, fall back to default if not available
-                try:
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-                except:
-                    try:
-                        font = ImageFont.truetype("arial.ttf", font_size)
-                    except:
-                        font = ImageFont.load_default()
+                font = load_font(font_size)
                 
                 # Wrap text to fit width
                 wrapped_lines = []
-                max_width = img_width - 80  # Leave 40px margin on each side
+                max_width = img_width - margin  # Leave 40px margin on each side
                 
                 for line in original_lines:
                     if not line.strip():
@@ -243,9 +1080,9 @@ class StateManager:
                             wrapped_lines.append(current_line)
                 
                 # Check if all lines fit vertically
-                line_height = font_size + 10
+                line_height = font_size + line_spacing
                 total_height = len(wrapped_lines) * line_height
-                max_height = img_height - 80  # Leave 40px margin top and bottom
+                max_height = img_height - margin  # Leave 40px margin top and bottom
                 
                 if total_height <= max_height:
                     break  # This font size works
@@ -257,8 +1094,10 @@ class StateManager:
                 if len(original_lines) > max_lines:
                     wrapped_lines[-1] = wrapped_lines[-1][:50] + "..."
             
+            METRICS.histogram("text_layout").observe(time.perf_counter() - layout_started)
+
             # Calculate text positioning for center alignment
-            line_height = (font.size if hasattr(font, 'size') else 24) + 10
+            line_height = (font.size if hasattr(font, 'size') else round(24 * scale)) + line_spacing
             total_height = len(wrapped_lines) * line_height
             start_y = (img_height - total_height) // 2
             
@@ -272,52 +1111,48 @@ class StateManager:
                     
                     draw.text((x, y), line, fill=text_color, font=font)
             
-            # Convert to base64
-            buffered = BytesIO()
-            img.save(buffered, format="PNG")
-            return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
+            return img
             
         except Exception as e:
-            print(f"[ERROR] Text to image conversion failed: {e}")
-            # Return a simple fallback
-            return ""
+            logger.error("Text to image conversion failed: %s", e)
+            return None
 
-    def create_image_with_text_base64(self, image_path, text_content):
+    def create_image_with_text_base64(self, image_path, text_content, size=None):
         """Create a base64 image with text above an image"""
+        img = self.create_image_with_text(image_path, text_content, size)
+        return self.encode_image_base64(img) if img is not None else ""
+
+    def create_image_with_text(self, image_path, text_content, size=None):
+        """Create an image with text above an image"""
+        from PIL import Image, ImageDraw
+        canvas_width, canvas_height = size or self.resolution
         try:
-            # Load the original image
-            original_img = Image.open(image_path)
-            
-            # Create canvas with extra space for text
-            canvas_width = 1280
-            canvas_height = 720
+            scale = canvas_height / REFERENCE_HEIGHT
             
             # Calculate required text height dynamically
             lines = text_content.split('\n')
             
             # Try different font sizes and calculate required space
-            font_sizes = [32, 28, 24, 20, 18, 16]
+            font_sizes = [round(s * scale) for s in (32, 28, 24, 20, 18, 16)]
+            line_spacing = round(8 * scale)
+            margin = round(80 * scale)
+            min_image_height = round(200 * scale)
             font = None
             wrapped_lines = []
-            required_text_height = 100  # Minimum space for text
+            required_text_height = round(100 * scale)  # Minimum space for text
+            layout_started = time.perf_counter()
+
+            # Temporary draw to measure text
+            temp_img = Image.new('RGB', (1, 1), color='white')
+            temp_draw = ImageDraw.Draw(temp_img)
             
             for font_size in font_sizes:
                 # Try to use a nice font, fall back to default if not available
-                try:
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-                except:
-                    try:
-                        font = ImageFont.truetype("arial.ttf", font_size)
-                    except:
-                        font = ImageFont.load_default()
-                
-                # Create temporary draw to measure text
-                temp_img = Image.new('RGB', (canvas_width, canvas_height), color='white')
-                temp_draw = ImageDraw.Draw(temp_img)
+                font = load_font(font_size)
                 
                 # Wrap text to fit width
                 wrapped_lines = []
-                max_width = canvas_width - 80  # Leave 40px margin on each side
+                max_width = canvas_width - margin  # Leave 40px margin on each side
                 
                 for line in lines:
                     if not line.strip():
@@ -351,31 +1186,28 @@ class StateManager:
                             wrapped_lines.append(current_line)
                 
                 # Calculate required height for this font size
-                line_height = font_size + 8
-                total_text_height = len(wrapped_lines) * line_height + 40  # Add padding
+                line_height = font_size + line_spacing
+                total_text_height = len(wrapped_lines) * line_height + round(40 * scale)  # Add padding
                 
                 # Check if we have enough space for both text and image
-                available_image_height = canvas_height - total_text_height - 20  # Extra margin
+                available_image_height = canvas_height - total_text_height - round(20 * scale)  # Extra margin
                 
-                if available_image_height > 200:  # Minimum reasonable image height
+                if available_image_height > min_image_height:  # Minimum reasonable image height
                     required_text_height = total_text_height
                     break
             
             # If no font size worked well, use smallest and adjust
-            if available_image_height <= 200:
+            if available_image_height <= min_image_height:
                 required_text_height = canvas_height // 3  # Use 1/3 for text, 2/3 for image
-                font_size = 16
-                try:
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-                except:
-                    font = ImageFont.load_default()
+                font_size = font_sizes[-1]
+                font = load_font(font_size)
+
+            METRICS.histogram("text_layout").observe(time.perf_counter() - layout_started)
             
             # Scale the original image to fit in the remaining space  
             available_height = canvas_height - required_text_height
-            img_scale_ratio = min(canvas_width / original_img.width, available_height / original_img.height)
-            scaled_img_width = int(original_img.width * img_scale_ratio)
-            scaled_img_height = int(original_img.height * img_scale_ratio)
-            scaled_img = original_img.resize((scaled_img_width, scaled_img_height), Image.Resampling.LANCZOS)
+            scaled_img = self.load_scaled_image(image_path, canvas_width, available_height)
+            scaled_img_width, scaled_img_height = scaled_img.size
             
             # Create the final canvas
             canvas = Image.new('RGB', (canvas_width, canvas_height), color='white')
@@ -385,7 +1217,7 @@ class StateManager:
             text_color = '#005097'
             
             # Calculate text positioning for center alignment
-            line_height = font_size + 8
+            line_height = font_size + line_spacing
             total_text_height = len(wrapped_lines) * line_height
             start_y = (required_text_height - total_text_height) // 2
             
@@ -404,35 +1236,31 @@ class StateManager:
             img_y = required_text_height + (available_height - scaled_img_height) // 2
             canvas.paste(scaled_img, (img_x, img_y))
             
-            # Convert to base64
-            buffered = BytesIO()
-            canvas.save(buffered, format="PNG")
-            return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
+            return canvas
             
         except Exception as e:
-            print(f"[ERROR] Image with text conversion failed: {e}")
+            logger.error("Image with text conversion failed: %s", e)
             # Fallback to just the image
             try:
-                img = Image.open(image_path)
-                img = self.scale_image(img, 1280, 720)
-                buffered = BytesIO()
-                img.save(buffered, format="PNG")
-                return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
+                return self.load_scaled_image(image_path, canvas_width, canvas_height)
             except:
-                return ""
+                return None
 
-    def create_empty_image_base64(self):
+    def create_empty_image_base64(self, size=None):
         """Create a blank/empty base64 image"""
+        img = self.create_empty_image(size)
+        return self.encode_image_base64(img) if img is not None else ""
+
+    def create_empty_image(self, size=None):
+        """Create a blank/empty image"""
+        from PIL import Image
         try:
             # Create a blank black image
-            img_width, img_height = 1280, 720
+            img_width, img_height = size or self.resolution
             img = Image.new('RGB', (img_width, img_height), color='black')
             
-            # Convert to base64
-            buffered = BytesIO()
-            img.save(buffered, format="PNG")
-            return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode('utf-8')}"
+            return img
             
         except Exception as e:
-            print(f"[ERROR] Empty image creation failed: {e}")
-            return ""
\ No newline at end of file
+            logger.error("Empty image creation failed: %s", e)
+            return None
\ No newline at end of file
@@ -0,0 +1,55 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from scenarios.scenario_parser import TxtScenario
+
+
+def _scenario(tmp_path, lines, role="switch"):
+    path = tmp_path / "relit.txt"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return TxtScenario(role, str(path))
+
+
+def test_seek_replays_relit_connection_in_last_command_order(tmp_path):
+    # client>switch is lit first and re-lit (reversed) after switch>router
+    scenario = _scenario(tmp_path, [
+        "1;switch;a.png;client>switch;;;",
+        "2;switch;b.png;switch>router;;;",
+        "3;switch;c.png;switch>client;;;",
+    ])
+
+    stepped = []
+    for step in range(len(scenario.valid_steps)):
+        stepped.extend(scenario.resolve(step)[1])
+    last_per_connection = {}
+    for action in stepped:
+        connection = tuple(sorted((action["source"], action["target"])))
+        last_per_connection.pop(connection, None)
+        last_per_connection[connection] = action
+
+    seeked = scenario.led_actions(scenario.wled_state(len(scenario.valid_steps) - 1))
+
+    assert seeked == list(last_per_connection.values())
+    assert [(action["source"], action["target"]) for action in seeked] == [
+        ("switch", "router"), ("switch", "client")
+    ]
+
+
+def test_step_and_seek_light_every_line_of_a_role(tmp_path):
+    # The switch has two LED lines in step 1
+    scenario = _scenario(tmp_path, [
+        "1;switch;a.png;client>switch;;;",
+        "1;switch;;switch>router;;;",
+        "2;router;b.png;;;;",
+    ])
+
+    _, stepped = scenario.resolve(0)
+    seeked = scenario.led_actions(scenario.wled_state(1))
+
+    assert [(action["source"], action["target"]) for action in stepped] == [
+        ("client", "switch"), ("switch", "router")
+    ]
+    assert seeked == stepped
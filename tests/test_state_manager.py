@@ -0,0 +1,38 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import action_dispatcher
+from scenarios.scenario_parser import TxtScenario
+from state_manager_web import StateManager
+
+
+def test_timeline_step_after_seek_runs_its_own_led_commands(tmp_path, monkeypatch):
+    path = tmp_path / "playback.txt"
+    # Long steps, so the timeline clock never advances on its own during the test
+    path.write_text("\n".join([
+        "1;switch;a.png;client>switch;60;;",
+        "2;switch;b.png;switch>router;60;;",
+        "3;router;c.png;router>firewall;60;;",
+        "4;switch;d.png;switch>client;60;;",
+    ]) + "\n", encoding="utf-8")
+    dispatched = []
+    monkeypatch.setattr(action_dispatcher, "run_actions", lambda actions: dispatched.append(
+        [(action["source"], action["target"]) for action in actions]))
+
+    manager = StateManager("switch", connect=False)
+    manager.load_scenario = lambda name: TxtScenario("switch", str(path))
+    try:
+        manager.update_state({"scenario": "playback", "step": 0})
+        manager.play()
+        manager.seek(2)
+        assert dispatched[-1] == [("client", "switch"), ("switch", "router")]
+
+        manager.call(manager._timeline_step, manager.timeline_clock, 3)
+
+        assert "wled_state" not in manager.get_state()
+        assert dispatched[-1] == [("switch", "client")]
+    finally:
+        manager.pause()
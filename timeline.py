@@ -0,0 +1,87 @@
+"""
+Timeline Playback
+
+For auto-progress the main node publishes a timeline once: the step it starts
+from, the start time on its clock and the seconds per step (time_sec of the
+step table). Every node then advances on its own clock; the main node only
+publishes again on pause, seek or when a node reports a step that does not
+match the timeline.
+"""
+
+import threading
+import time
+
+
+def build_timeline(start_step, durations, started_at=None):
+    return {
+        "start_step": start_step,
+        "started_at": time.time() if started_at is None else started_at,
+        "durations": [round(float(duration), 3) for duration in durations]
+    }
+
+
+def timeline_position(timeline, now):
+    """
+    Return (step, seconds until the next step) at `now` on the main node's clock.
+    The last step is held, its remaining time is None.
+    """
+    durations = timeline["durations"]
+    step = timeline["start_step"]
+    elapsed = max(0.0, now - timeline["started_at"])
+    while step < len(durations) - 1:
+        if elapsed < durations[step]:
+            return step, durations[step] - elapsed
+        elapsed -= durations[step]
+        step += 1
+    return step, None
+
+
+def step_started_at(timeline, step):
+    """Time on the main node's clock at which `step` of the timeline is due"""
+    durations = timeline["durations"]
+    return timeline["started_at"] + sum(durations[timeline["start_step"]:step])
+
+
+def timeline_steps(timeline, until):
+    """(step, due time) of every step after the start step that is due before `until`"""
+    steps = []
+    for step in range(timeline["start_step"] + 1, len(timeline["durations"])):
+        due = step_started_at(timeline, step)
+        if due >= until:
+            break
+        steps.append((step, due))
+    return steps
+
+
+class TimelineClock:
+    """Calls on_step(clock, step) at every step boundary of one timeline, on the local clock"""
+
+    def __init__(self, timeline, on_step, clock_offset=0.0):
+        self.timeline = timeline
+        self.on_step = on_step
+        # Main node clock minus local clock
+        self.clock_offset = clock_offset
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="timeline")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def position(self):
+        return timeline_position(self.timeline, time.time() + self.clock_offset)
+
+    def _run(self):
+        last_step = None
+        while not self._stopped.is_set():
+            step, remaining = self.position()
+            if step != last_step:
+                self.on_step(self, step)
+                last_step = step
+            if remaining is None:
+                return
+            # Deadlines come from the start time, sleep jitter never accumulates
+            self._stopped.wait(remaining + 0.001)
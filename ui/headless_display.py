@@ -0,0 +1,192 @@
+"""
+Headless displays
+
+Render frames without a webview, either as PNG files into an output directory
+or directly into the Linux framebuffer. Used on nodes where a full GTK WebKit
+instance is too heavy, and for load tests and CI on headless machines.
+"""
+
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from config import HEADLESS_OUTPUT_DIR, FRAMEBUFFER_DEVICE
+from metrics import METRICS
+from startup import record_startup_metric
+from config.display_profiles import configured_resolution
+
+logger = logging.getLogger(__name__)
+
+
+class HeadlessDisplay(ABC):
+    # Sinks showing encoded frames get them pre-rendered into the frame store; others render PIL images in update()
+    uses_frame_store = False
+
+    def __init__(self, state_manager):
+        self.state_manager = state_manager
+        self.frames_written = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def update(self):
+        """Render the current content and push it to the output"""
+        with self._lock:
+            started = time.perf_counter()
+            img = self.state_manager.render_display_image()
+            if img is None:
+                return
+            # The only render of this frame, the quality governor judges it
+            self.state_manager.quality.observe(time.perf_counter() - started)
+            try:
+                with METRICS.timer("bridge_delivery"):
+                    self.show(img)
+                self.frames_written += 1
+                record_startup_metric("time_to_first_frame")
+                record_startup_metric("time_to_live_frame")
+                self.state_manager.remember_frame(img)
+            except Exception as e:
+                logger.warning("Headless display update failed: %s", e)
+
+    @abstractmethod
+    def show(self, img):
+        """Put a rendered PIL image on the output"""
+
+    def run(self):
+        """Block like webview.start() until stop() is called"""
+        self.show_startup_frame()
+        self.state_manager.set_display_sink(self)
+        self.update()
+        self._stopped.wait()
+
+    def show_startup_frame(self):
+        """Put the last frame of the previous run on screen before the first render"""
+        last_frame = self.state_manager.last_frame
+        png = last_frame.load() if last_frame else None
+        if not png:
+            return
+        try:
+            from io import BytesIO
+            from PIL import Image
+            img = Image.open(BytesIO(png))
+            img.load()
+            with self._lock:
+                self.show(img)
+            record_startup_metric("time_to_first_frame")
+        except Exception as e:
+            logger.warning("Startup frame could not be shown: %s", e)
+
+    def stop(self):
+        self._stopped.set()
+
+
+class FileDisplay(HeadlessDisplay):
+    """Write every frame as current.png (and optionally numbered copies) into a directory"""
+
+    uses_frame_store = True
+
+    def __init__(self, state_manager, output_dir=HEADLESS_OUTPUT_DIR, keep_frames=False):
+        super().__init__(state_manager)
+        self.output_dir = output_dir
+        self.keep_frames = keep_frames
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def update(self):
+        # Frames come encoded from the frame store, no image needed here
+        with self._lock:
+            png = self.state_manager.get_display_png()
+            if png is None:
+                return
+            try:
+                with METRICS.timer("bridge_delivery"):
+                    self.write_png(png)
+                self.frames_written += 1
+                record_startup_metric("time_to_first_frame")
+                record_startup_metric("time_to_live_frame")
+            except Exception as e:
+                logger.warning("Headless display update failed: %s", e)
+
+    def show(self, img):
+        self.write_png(self.state_manager.encode_image_png(img))
+
+    def write_png(self, png):
+        target = os.path.join(self.output_dir, "current.png")
+        tmp_path = target + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(png)
+        # Atomic replace, readers never see a half-written frame
+        os.replace(tmp_path, target)
+
+        if self.keep_frames:
+            frame_path = os.path.join(self.output_dir, f"frame_{self.frames_written:06d}.png")
+            with open(frame_path, "wb") as f:
+                f.write(png)
+
+
+class FramebufferDisplay(HeadlessDisplay):
+    """Blit frames into a Linux framebuffer device (16 or 32 bits per pixel)"""
+
+    def __init__(self, state_manager, device=FRAMEBUFFER_DEVICE):
+        super().__init__(state_manager)
+        self.device = device
+        sysfs = os.path.join("/sys/class/graphics", os.path.basename(device))
+        self.width, self.height = self._read_pair(os.path.join(sysfs, "virtual_size"))
+        self.bits_per_pixel = int(self._read(os.path.join(sysfs, "bits_per_pixel")))
+        stride_path = os.path.join(sysfs, "stride")
+        if os.path.exists(stride_path):
+            self.stride = int(self._read(stride_path))
+        else:
+            self.stride = self.width * self.bits_per_pixel // 8
+        if self.bits_per_pixel not in (16, 32):
+            raise ValueError(f"Unsupported framebuffer depth: {self.bits_per_pixel} bpp")
+        if not configured_resolution():
+            # Render at the panel size, no scaling step before the blit
+            state_manager.set_resolution(self.width, self.height)
+
+    @staticmethod
+    def _read(path):
+        with open(path, "r") as f:
+            return f.read().strip()
+
+    def _read_pair(self, path):
+        width, height = self._read(path).split(",")
+        return int(width), int(height)
+
+    def _to_raw(self, img):
+        from PIL import Image, ImageChops
+
+        # Letterbox onto a black canvas of the framebuffer size
+        canvas = Image.new("RGB", (self.width, self.height), "black")
+        frame = img.convert("RGB")
+        if frame.size != canvas.size:
+            frame = self.state_manager.scale_image(frame, self.width, self.height)
+        canvas.paste(frame, ((self.width - frame.width) // 2, (self.height - frame.height) // 2))
+
+        if self.bits_per_pixel == 32:
+            raw = canvas.tobytes("raw", "BGRX")
+        else:
+            # RGB565 little endian: high byte RRRRRGGG, low byte GGGBBBBB
+            r, g, b = canvas.split()
+            high = ImageChops.add(r.point(lambda v: v & 0xF8), g.point(lambda v: v >> 5))
+            low = ImageChops.add(g.point(lambda v: (v & 0x1C) << 3), b.point(lambda v: v >> 3))
+            raw = Image.merge("LA", (low, high)).tobytes()
+
+        row_bytes = self.width * self.bits_per_pixel // 8
+        if row_bytes == self.stride:
+            return raw
+        padding = b"\x00" * (self.stride - row_bytes)
+        return b"".join(
+            raw[y * row_bytes:(y + 1) * row_bytes] + padding for y in range(self.height)
+        )
+
+    def show(self, img):
+        raw = self._to_raw(img)
+        with open(self.device, "r+b", buffering=0) as fb:
+            fb.write(raw)
+
+
+def create_headless_display(state_manager, display_mode):
+    if display_mode == "framebuffer":
+        return FramebufferDisplay(state_manager)
+    return FileDisplay(state_manager)
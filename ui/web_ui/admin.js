@@ -40,9 +40,9 @@ window.addEventListener("pywebviewready", async () => {
       return td;
     };
 
-    row.appendChild(makeBtn("Reboot", () => window.pywebview.api.remote_reboot(dev.name)));
-    row.appendChild(makeBtn("Shutdown", () => window.pywebview.api.remote_shutdown(dev.name)));
-    row.appendChild(makeBtn("Exit", () => window.pywebview.api.remote_exit(dev.name)));
+    row.appendChild(makeBtn("Reboot", () => window.pywebview.api.remote_reboot(dev.name).then(logResults)));
+    row.appendChild(makeBtn("Shutdown", () => window.pywebview.api.remote_shutdown(dev.name).then(logResults)));
+    row.appendChild(makeBtn("Exit", () => window.pywebview.api.remote_exit(dev.name).then(logResults)));
 
     // Dropdown Typ
     const typCell = document.createElement("td");
@@ -65,7 +65,7 @@ window.addEventListener("pywebviewready", async () => {
 
     // Start
     row.appendChild(makeBtn("Start", () =>
-      window.pywebview.api.remote_start(dev.name, select.value)
+      window.pywebview.api.remote_start(dev.name, select.value).then(logResults)
     ));
 
     tbody.appendChild(row);
@@ -100,3 +100,53 @@ function updateAllDeviceStatuses() {
     console.error("Fehler bei get_all_device_statuses:", err);
   });
 }
+
+function startAllInRoles() {
+  const btn = document.getElementById("start-all-btn");
+  btn.disabled = true;
+  window.pywebview.api.remote_start_all().then(logResults).finally(() => {
+    btn.disabled = false;
+  });
+}
+
+function logResults(results) {
+  const log = document.getElementById("command-log");
+  const lines = [].concat(results).map(r => {
+    const state = r.ok ? "OK" : (r.timed_out ? "TIMEOUT" : `FEHLER (${r.exit_code})`);
+    const detail = r.ok ? "" : ` ${r.stderr}`;
+    return `${r.name}: ${state} in ${r.duration}s${detail}`;
+  });
+  log.textContent = lines.join("\n");
+}
+
+function startProfiling() {
+  window.pywebview.api.start_profiling(10).then(() => {
+    document.getElementById("command-log").textContent = "Profiler läuft auf allen Knoten für die nächsten 10 Schritte";
+  });
+}
+
+function collectProfiles() {
+  const btn = document.getElementById("collect-profiles-btn");
+  btn.disabled = true;
+  window.pywebview.api.collect_profiles().then(logProfiles).finally(() => {
+    btn.disabled = false;
+  });
+}
+
+function logProfiles(profiles) {
+  const log = document.getElementById("command-log");
+  if (!profiles.length) {
+    log.textContent = "Keine Profile vorhanden";
+    return;
+  }
+  const lines = [];
+  profiles.forEach(profile => {
+    lines.push(`${profile.address}${profile.host ? ` @ ${profile.host}` : ""}${profile.path ? ` -> ${profile.path}` : ""}`);
+    profile.steps.forEach(step => {
+      const hottest = step.self.slice(0, 3).map(([name, count]) =>
+        `${name} ${Math.round(count * 100 / Math.max(1, step.samples))}%`).join(", ");
+      lines.push(`  ${step.step}: ${step.sampled_ms}ms  ${hottest || "-"}`);
+    });
+  });
+  log.textContent = lines.join("\n");
+}
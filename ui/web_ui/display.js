@@ -1,7 +1,23 @@
+// Set once a live frame is on screen, the startup frame must not replace it
+let liveFrameShown = false;
+
 function updateImage() {
-    window.pywebview.api.get_image().then(base64img => {
-        document.getElementById("display").src = base64img;
+    window.pywebview.api.get_frame().then(frame => {
+        liveFrameShown = true;
+        renderFrame(document.getElementById("stage"), frame);
+    });
+}
+
+function showStartupFrame() {
+    // Last frame of the previous run (bitmap or layers), shown until the first live frame arrives
+    window.pywebview.api.get_startup_frame().then(frame => {
+        if (frame && !liveFrameShown) {
+            renderFrame(document.getElementById("stage"), frame);
+        }
     });
 }
 
-document.addEventListener("DOMContentLoaded", updateImage);
+document.addEventListener("DOMContentLoaded", () => {
+    showStartupFrame();
+    updateImage();
+});
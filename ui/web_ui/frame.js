@@ -0,0 +1,23 @@
+// Shows a frame from get_frame(): either a rendered bitmap or image and caption layers
+function renderFrame(stage, frame) {
+  const img = stage.querySelector(".frame-image");
+  const caption = stage.querySelector(".frame-caption");
+
+  if (frame.kind === "bitmap") {
+    stage.dataset.layout = "bitmap";
+    caption.textContent = "";
+    img.src = frame.src;
+    return;
+  }
+
+  stage.dataset.layout = frame.layout;
+  caption.textContent = frame.text || "";
+  if (frame.image) {
+    // Same URL as before: the browser keeps the decoded bitmap, nothing is reloaded
+    if (img.getAttribute("src") !== frame.image) {
+      img.src = frame.image;
+    }
+  } else {
+    img.removeAttribute("src");
+  }
+}
@@ -10,6 +10,7 @@ window.addEventListener('pywebviewready', () => {
     return window.pywebview.api.get_auto_timeout();
   }).then(timeout => {
     autoTimeout = timeout;
+    initScrubber();
     updateStatus();
     updateImage();
     updateAutoButton();
@@ -66,6 +67,35 @@ function previousStep() {
   });
 }
 
+function initScrubber() {
+  const scrubber = document.getElementById("scrubber");
+  scrubber.max = Math.max(0, maxSteps - 1);
+
+  // Nur Vorschau der Schrittnummer beim Ziehen, gesprungen wird beim Loslassen
+  scrubber.addEventListener("input", () => {
+    document.getElementById("status").innerText =
+      "Schritt: " + (Number(scrubber.value) + 1) + " / " + maxSteps;
+  });
+  scrubber.addEventListener("change", () => {
+    scrubber.blur();  // Pfeiltasten wieder für Zurück/Weiter
+    seekTo(Number(scrubber.value));
+  });
+}
+
+function seekTo(step) {
+  if (stepLock) return;
+  stepLock = true;
+  stopAutoProgress();
+
+  window.pywebview.api.seek(step).then(() => {
+    updateStatus();
+    updateImage();
+    updateAutoButton();
+  }).finally(() => {
+    stepLock = false;
+  });
+}
+
 function restartScenario() {
   stopAutoProgress();
   window.pywebview.api.get_status().then(state => {
@@ -86,13 +116,14 @@ function exitScenario() {
 function updateStatus() {
   window.pywebview.api.get_status().then(state => {
     document.getElementById("status").innerText = "Schritt: " + (state.step + 1) + " / " + maxSteps;
+    document.getElementById("scrubber").value = state.step;
   });
   updateNavigationButtons();
 }
 
 function updateImage() {
-  window.pywebview.api.get_image().then(base64img => {
-    document.getElementById("scenarioImage").src = base64img;
+  window.pywebview.api.get_frame().then(frame => {
+    renderFrame(document.getElementById("scenarioImage-container"), frame);
   });
 }
 
@@ -102,20 +133,22 @@ function startAutoProgress() {
 
   if (autoInterval) clearInterval(autoInterval);
 
-  autoInterval = setInterval(() => {
-    window.pywebview.api.get_status().then(state => {
-      if (state.step + 1 >= maxSteps) {
-        stopAutoProgress();
-        updateAutoButton();
-      } else {
-        window.pywebview.api.next_step().then(() => {
+  // Die Knoten laufen selbst nach Zeitplan (time_sec), hier wird nur die Anzeige nachgeführt
+  let shownStep = null;
+  window.pywebview.api.play().then(() => {
+    autoInterval = setInterval(() => {
+      window.pywebview.api.get_status().then(state => {
+        if (state.step !== shownStep) {
+          shownStep = state.step;
           updateStatus();
           updateImage();
-          updateAutoButton();
-        });
-      }
-    });
-  }, autoTimeout);
+        }
+        if (!state.timeline || state.step + 1 >= maxSteps) {
+          stopAutoProgress();
+        }
+      });
+    }, 250);
+  });
 }
 
 function updateNavigationButtons() {
@@ -129,6 +162,9 @@ function updateNavigationButtons() {
 }
 
 function stopAutoProgress() {
+  if (autoProgress) {
+    window.pywebview.api.pause();
+  }
   autoProgress = false;
   clearInterval(autoInterval);
   autoInterval = null;
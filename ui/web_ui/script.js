@@ -17,11 +17,46 @@ document.addEventListener("DOMContentLoaded", () => {
   }
 
   waitForPywebviewApi(() => {
+    loadScenarioCatalog();
     loadDeviceListOnce();
     setInterval(updateDeviceStatuses, 5000); // alle 5 Sekunden
   });
 });
 
+function loadScenarioCatalog() {
+  window.pywebview.api.get_scenario_catalog().then(entries => {
+    const container = document.getElementById("scenario-selection");
+    container.innerHTML = "";
+
+    entries.forEach(entry => {
+      const btn = document.createElement("button");
+      btn.className = "scenario-card";
+      btn.onclick = () => startScenario(entry.id);
+
+      if (entry.thumbnail) {
+        const thumb = document.createElement("img");
+        thumb.src = entry.thumbnail;
+        btn.appendChild(thumb);
+      }
+
+      const label = document.createElement("span");
+      label.className = "scenario-label";
+      label.textContent = entry.label;
+      btn.appendChild(label);
+
+      const meta = document.createElement("span");
+      meta.className = "scenario-meta";
+      const minutes = Math.max(1, Math.round(entry.duration_sec / 60));
+      meta.textContent = `${entry.steps} Schritte · ca. ${minutes} min · ${entry.devices.join(", ")}`;
+      btn.appendChild(meta);
+
+      container.appendChild(btn);
+    });
+  }).catch(err => {
+    console.error("Fehler beim Laden des Szenario-Katalogs:", err);
+  });
+}
+
 function waitForPywebviewApi(callback, retries = 20, delay = 200) {
   if (window.pywebview && window.pywebview.api && typeof window.pywebview.api.get_device_list === 'function') {
     console.log("pywebview.api ist bereit");
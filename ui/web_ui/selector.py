@@ -1,6 +1,9 @@
 import webview
 from config import AUTO_PROGRESS_TIMEOUT
 import os
+import shlex
+import sys
+import threading
 
 class WebScenarioSelector:
     
@@ -14,6 +17,17 @@ class WebScenarioSelector:
             self.state_manager = state_manager
             self.logo_clicks = 0
 
+        @property
+        def catalog(self):
+            if not hasattr(self, "_catalog"):
+                from scenarios.scenario_catalog import ScenarioCatalog
+                self._catalog = ScenarioCatalog(self.state_manager)
+            return self._catalog
+
+        def get_scenario_catalog(self):
+            """Scenario menu entries: label, steps, devices, duration and thumbnail"""
+            return self.catalog.entries()
+
         def get_max_steps(self):
             return self.state_manager.get_max_steps()
 
@@ -26,24 +40,32 @@ class WebScenarioSelector:
             return True
 
         def next_step(self):
-            step = self.state_manager.state["step"] + 1
-            self.state_manager.update_state({"step": step})
-            return step
+            return self.state_manager.advance(1)
 
         def previous_step(self):
-            step = max(0, self.state_manager.state["step"] - 1)
-            self.state_manager.update_state({"step": step})
-            return step
+            return self.state_manager.advance(-1)
         
+        def seek(self, step):
+            return self.state_manager.seek(step)
+
+        def play(self):
+            return self.state_manager.play()
+
+        def pause(self):
+            return self.state_manager.pause()
+
         def get_auto_timeout(self):
             return AUTO_PROGRESS_TIMEOUT
 
         def get_status(self):
-            return self.state_manager.state
+            return self.state_manager.get_state()
 
         def get_image(self):
             return self.state_manager.get_display_image_base64()
 
+        def get_frame(self):
+            return self.state_manager.get_display_frame()
+
         def logo_clicked(self):
             self.logo_clicks += 1
             if self.logo_clicks >= 5:
@@ -143,52 +165,69 @@ class WebScenarioSelector:
                         results.append({"name": futures[future], "status": "❌", "role": "no role"})
             return results
         
+        @property
+        def fleet(self):
+            if not hasattr(self, "_fleet"):
+                from config.rpi_status_config import RPI_HOSTS
+                from fleet_executor import FleetExecutor
+                self._fleet = FleetExecutor(RPI_HOSTS)
+            return self._fleet
+
         def remote_reboot(self, name):
-            return self._run_ssh_cmd(name, ["sudo", "reboot"])
+            return self.fleet.run_on(name, ["sudo", "reboot"])
 
         def remote_shutdown(self, name):
-            return self._run_ssh_cmd(name, ["sudo", "shutdown", "now"])
+            return self.fleet.run_on(name, ["sudo", "shutdown", "now"])
 
         def remote_exit(self, name):
-            return self._run_ssh_cmd(name, ["pkill", "-f", "main_web.py"])
+            return self.fleet.run_on(name, ["pkill", "-f", "main_web.py"])
 
         def remote_start(self, name, device_type):
-            from config.rpi_status_config import RPI_HOSTS
-            ip = RPI_HOSTS.get(name)
-            if not ip:
-                return False
-
-            cmd = f"cd {self.PROJECT_PATH} && python3 main_web.py {device_type}"
-            return self._run_ssh_cmd(name, cmd, shell=True) 
+            return self.fleet.run_on(name, self._start_command(device_type))
 
-        def _run_ssh_cmd(self, name, cmd, shell=False):
-            from config.rpi_status_config import RPI_HOSTS
-            import subprocess
+        def remote_start_all(self, names=None):
+            """Start every node (or the given names) in its configured role"""
+            from config.device_roles import DEVICE_ROLE_MAP
 
-            ip = RPI_HOSTS.get(name)
-            if not ip:
-                return False
+            commands = {}
+            for name in (names or self.fleet.hosts.keys()):
+                role = DEVICE_ROLE_MAP.get(name.lower())
+                if role:
+                    commands[name] = self._start_command(role)
+            return list(self.fleet.run(commands).values())
 
-            if shell:
-                ssh_cmd = f'ssh rpi@{ip} "{cmd}"'
-            else:
-                ssh_cmd = ["ssh", f"rpi@{ip}"] + cmd
+        def start_profiling(self, steps=10):
+            """Profile the next steps on every node of the rig"""
+            self.state_manager.request_profile(int(steps))
+            return True
 
-            try:
-                if shell:
-                    subprocess.run(ssh_cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
-                else:
-                    subprocess.run(ssh_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
-                return True
-            except Exception as e:
-                print(f"SSH ERROR: {e}")
-                return False
+        def collect_profiles(self):
+            """Per-step summaries of every node; the collapsed stacks are saved on this node"""
+            from profiler import save_profile
 
+            results = []
+            for profile in self.state_manager.collect_profiles():
+                results.append({
+                    "address": profile.get("address"),
+                    "finished_at": profile.get("finished_at"),
+                    "steps": profile.get("steps", []),
+                    "path": save_profile(profile, profile.get("address") or "node")
+                })
+            return results
 
-        
+        def _start_command(self, device_type):
+            # Only the node process is detached. A failed cd, or a process gone again
+            # after a second (bad role, import error), makes ssh exit non-zero
+            return (
+                f"cd {shlex.quote(self.PROJECT_PATH)} || exit 1; "
+                f"nohup python3 main_web.py {shlex.quote(device_type)} </dev/null >/dev/null 2>&1 & "
+                f"sleep 1; kill -0 $! 2>/dev/null || exit 1"
+            )
 
     def run(self):
         api = self.Api(self.state_manager)
+        # Bring the scenario catalog up to date while the window starts
+        threading.Thread(target=api.get_scenario_catalog, daemon=True).start()
         try:
             webview.create_window(
                 "Packet Visualizer",
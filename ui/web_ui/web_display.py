@@ -1,19 +1,49 @@
+import logging
 import webview
 import sys
+from startup import record_startup_metric
+from config.display_profiles import configured_resolution
+
+logger = logging.getLogger(__name__)
 
 class WebDeviceDisplay:
     def __init__(self, state_manager):
         self.state_manager = state_manager
 
     class Api:
-        def __init__(self, get_image_func):
-            self.get_image_func = get_image_func
+        def __init__(self, state_manager):
+            self.state_manager = state_manager
+
+        def get_startup_frame(self):
+            frame = self.state_manager.get_startup_frame()
+            if frame:
+                record_startup_metric("time_to_first_frame")
+            return frame
 
         def get_image(self):
-            return self.get_image_func()
+            image = self.state_manager.get_display_image_base64()
+            record_startup_metric("time_to_first_frame")
+            record_startup_metric("time_to_live_frame")
+            return image
+
+        def get_frame(self):
+            frame = self.state_manager.get_display_frame()
+            record_startup_metric("time_to_first_frame")
+            record_startup_metric("time_to_live_frame")
+            return frame
+
+    def detect_resolution(self):
+        """Render at the native screen size unless a profile pins the resolution"""
+        if configured_resolution():
+            return
+        try:
+            screen = webview.screens[0]
+            self.state_manager.set_resolution(screen.width, screen.height)
+        except Exception as e:
+            logger.warning("Screen size detection failed: %s", e)
 
     def run(self):
-        api = self.Api(self.state_manager.get_display_image_base64)
+        api = self.Api(self.state_manager)
         try:
             self.window = webview.create_window(
                 f"Display: {self.state_manager.role}",
@@ -25,6 +55,7 @@ class WebDeviceDisplay:
 
             # Trigger Update, sobald Webview-Fenster läuft
             def on_webview_ready():
+                self.detect_resolution()
                 self.state_manager.trigger_webview_update()
 
             webview.start(on_webview_ready, debug=False)
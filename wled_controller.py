@@ -1,9 +1,11 @@
+import logging
 import aiohttp
-import json
 import asyncio
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
+logger = logging.getLogger(__name__)
+
 # WLED CONTROLLER Playlists
 # channel 1 foreward 7 reverse 9
 # channel 2 foreward 8 reverse 10
@@ -51,8 +53,7 @@ class WledController:
                 "on": on,
                 "ps": preset
             }
-            print(f"Sending request to {self.base_url}")
-            print(f"Payload: {json.dumps(payload, indent=2)}")
+            logger.debug("Sending request to %s: %s", self.base_url, payload)
 
             async with aiohttp.ClientSession() as session:
                 async with session.post(
@@ -60,13 +61,12 @@ class WledController:
                         headers=self.headers,
                         json=payload
                 ) as response:
-                    print(f"Response status: {response.status}")
-                    text = await response.text()
-                    print(f"Response body: {text}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Response %s: %s", response.status, await response.text())
                     return response.status == 200
 
         except Exception as e:
-            print(f"Error controlling LED: {e}")
+            logger.warning("Error controlling LED %s: %s", self.base_url, e)
             return False
 
     def turn_on(self, reverse=False):
@@ -80,3 +80,36 @@ class WledController:
     #    """Turn LED off"""
     #    if self.loop:
     #        asyncio.run_coroutine_threadsafe(self.set_state(False), self.loop)
+
+
+# Device connections and the WLED controller (ip, channel) lighting them
+WLED_CONNECTIONS = {
+    ('client', 'switch'): ("192.168.50.21", 1),
+    ('switch', 'router'): ("192.168.50.21", 2),
+    ('router', 'firewall'): ("192.168.50.22", 2),
+    ('firewall', 'server'): ("192.168.50.22", 1),
+    ('router', 'dns'): ("192.168.50.23", 1),
+    ('dns', 'router'): ("192.168.50.23", 1),
+}
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(ip_address, channel):
+    """Shared controller per (ip, channel), each one owns an event loop thread"""
+    with _controllers_lock:
+        controller = _controllers.get((ip_address, channel))
+        if controller is None:
+            controller = _controllers[(ip_address, channel)] = WledController(ip_address, channel)
+        return controller
+
+
+def light_connection(source, target, reverse=False):
+    """Play the playlist of the connection source -> target, False if it has no controller"""
+    connection = WLED_CONNECTIONS.get((source, target))
+    if connection is None:
+        return False
+    get_controller(*connection).turn_on(reverse)
+    logger.debug("WLED: %s -> %s (reverse: %s)", source, target, reverse)
+    return True